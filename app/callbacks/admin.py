@@ -1,9 +1,15 @@
+import csv
+import os
+import tempfile
+from datetime import datetime
+
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, FSInputFile
 
 from app.config_reader import config
-from app.services.database import get_all_users, get_blocked_users, get_user_statistics
+from app.handlers.admin import render_users_page
+from app.services.database import iter_users, get_blocked_users, get_user_statistics, get_daily_statistics
 from app.keyboards.admin import get_user_management_keyboard, get_user_statistics_keyboard
 from app.states.admin import AdminStates
 from app.utils.logger import admin_logger
@@ -12,40 +18,100 @@ router = Router()
 
 
 @router.callback_query(F.data == "list_users")
-async def list_users(callback: CallbackQuery):
+async def list_users(callback: CallbackQuery, state: FSMContext):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} requested user list")
+    admin_logger.info("Admin %s requested user list", admin_id)
     if admin_id != config.admin_user_id:
-        admin_logger.warning(f"Unauthorized access attempt to user list by user {admin_id}")
-        await callback.edit_text("У вас нет доступа к этой функции.", show_alert=True)
+        admin_logger.warning("Unauthorized access attempt to user list by user %s", admin_id)
+        await callback.answer("У вас нет доступа к этой функции.", show_alert=True)
         return
 
-    users = await get_all_users()
-    user_list = "\n".join([f"ID: {user[0]}, Имя: {user[1]}, Возраст: {user[2]}" for user in users])
+    await state.update_data(users_query=None)
+    text, keyboard = await render_users_page()
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    admin_logger.info("User list displayed for admin %s", admin_id)
+
 
-    if len(user_list) > 4096:
-        admin_logger.info(f"User list too long, splitting into parts for admin {admin_id}")
-        parts = [user_list[i:i + 4096] for i in range(0, len(user_list), 4096)]
-        for part in parts:
-            await callback.message.answer(part)
+@router.callback_query(F.data.startswith("users_prev_") | F.data.startswith("users_next_"))
+async def turn_users_page(callback: CallbackQuery, state: FSMContext):
+    admin_id = callback.from_user.id
+    if admin_id != config.admin_user_id:
+        admin_logger.warning("Unauthorized access attempt to user list by user %s", admin_id)
+        await callback.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    _, direction, user_id = callback.data.split("_")
+    query = (await state.get_data()).get("users_query")
+    admin_logger.info("Admin %s turned user list %s from %s, query: %s", admin_id, direction, user_id, query)
+    if direction == "next":
+        text, keyboard = await render_users_page(query, after=int(user_id))
     else:
-        await callback.message.edit_text(f"Список пользователей:\n\n{user_list}",
-                                         reply_markup=get_user_management_keyboard())
-    admin_logger.info(f"User list displayed for admin {admin_id}")
+        text, keyboard = await render_users_page(query, before=int(user_id))
+    await callback.message.edit_text(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data == "users_search")
+async def start_user_search(callback: CallbackQuery, state: FSMContext):
+    admin_id = callback.from_user.id
+    admin_logger.info("Admin %s initiated user search", admin_id)
+    if admin_id != config.admin_user_id:
+        admin_logger.warning("Unauthorized attempt to search users by user %s", admin_id)
+        await callback.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    await callback.message.edit_text("Введите ID или начало имени пользователя:")
+    await state.set_state(AdminStates.waiting_for_user_search)
+
+
+@router.callback_query(F.data == "users_search_reset")
+async def reset_user_search(callback: CallbackQuery, state: FSMContext):
+    await list_users(callback, state)
+
+
+@router.callback_query(F.data == "users_export")
+async def export_users(callback: CallbackQuery):
+    admin_id = callback.from_user.id
+    admin_logger.info("Admin %s requested users export", admin_id)
+    if admin_id != config.admin_user_id:
+        admin_logger.warning("Unauthorized attempt to export users by user %s", admin_id)
+        await callback.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    await callback.answer("Готовлю файл...")
+    # Файл пишется порциями, в памяти одновременно не больше одной порции
+    fd, path = tempfile.mkstemp(prefix="users_", suffix=".csv")
+    try:
+        exported = 0
+        with os.fdopen(fd, "w", newline="", encoding="utf-8-sig") as file:
+            writer = csv.writer(file)
+            writer.writerow(["id", "name", "age", "username", "is_blocked", "block_reason"])
+            async for users in iter_users(config.users_export_chunk_size):
+                writer.writerows(tuple(user) for user in users)
+                exported += len(users)
+        await callback.message.answer_document(
+            FSInputFile(path, filename=f"users_{datetime.now():%Y%m%d_%H%M}.csv"),
+            caption=f"Пользователей: {exported}"
+        )
+        admin_logger.info("Exported %s users for admin %s", exported, admin_id)
+    except Exception as e:
+        admin_logger.error("Error exporting users for admin %s: %s", admin_id, e, exc_info=True)
+        await callback.message.answer("Не удалось выгрузить список пользователей.")
+    finally:
+        os.remove(path)
 
 
 @router.callback_query(F.data == "blocked_users")
 async def show_blocked_users(callback: CallbackQuery):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} requested blocked users list")
+    admin_logger.info("Admin %s requested blocked users list", admin_id)
     if admin_id != config.admin_user_id:
-        admin_logger.warning(f"Unauthorized access attempt to blocked users list by user {admin_id}")
+        admin_logger.warning("Unauthorized access attempt to blocked users list by user %s", admin_id)
         await callback.edit_text("У вас нет доступа к этой функции.", show_alert=True)
         return
 
     blocked_users = await get_blocked_users()
     if not blocked_users:
-        admin_logger.info(f"No blocked users found for admin {admin_id}")
+        admin_logger.info("No blocked users found for admin %s", admin_id)
         await callback.message.edit_text("Нет заблокированных пользователей.",
                                          reply_markup=get_user_management_keyboard())
         return
@@ -53,70 +119,81 @@ async def show_blocked_users(callback: CallbackQuery):
     user_list = "\n".join([f"ID: {user[0]}, Имя: {user[1]}, Причина: {user[2]}" for user in blocked_users])
     await callback.message.edit_text(f"Заблокированные пользователи:\n\n{user_list}",
                                      reply_markup=get_user_management_keyboard())
-    admin_logger.info(f"Blocked users list displayed for admin {admin_id}")
+    admin_logger.info("Blocked users list displayed for admin %s", admin_id)
 
 
 @router.callback_query(F.data == "block_user")
 async def start_block_user(callback: CallbackQuery, state: FSMContext):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} initiated user blocking process")
+    admin_logger.info("Admin %s initiated user blocking process", admin_id)
     if admin_id != config.admin_user_id:
-        admin_logger.warning(f"Unauthorized attempt to block user by user {admin_id}")
+        admin_logger.warning("Unauthorized attempt to block user by user %s", admin_id)
         await callback.edit_text("У вас нет доступа к этой функции.", show_alert=True)
         return
 
     await callback.message.edit_text("Введите ID пользователя, которого хотите заблокировать:")
     await state.set_state(AdminStates.waiting_for_user_id)
-    admin_logger.info(f"Admin {admin_id} prompted for user ID to block")
+    admin_logger.info("Admin %s prompted for user ID to block", admin_id)
 
 
 @router.callback_query(F.data == "unblock_user")
 async def start_unblock_user(callback: CallbackQuery, state: FSMContext):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} initiated user unblocking process")
+    admin_logger.info("Admin %s initiated user unblocking process", admin_id)
     if admin_id != config.admin_user_id:
-        admin_logger.warning(f"Unauthorized attempt to unblock user by user {admin_id}")
+        admin_logger.warning("Unauthorized attempt to unblock user by user %s", admin_id)
         await callback.edit_text("У вас нет доступа к этой функции.", show_alert=True)
         return
 
     await callback.message.edit_text("Введите ID пользователя, которого хотите разблокировать:")
     await state.set_state(AdminStates.waiting_for_user_id_unblock)
-    admin_logger.info(f"Admin {admin_id} prompted for user ID to unblock")
+    admin_logger.info("Admin %s prompted for user ID to unblock", admin_id)
 
 
-def format_user_statistics(stats):
-    return (
+def format_user_statistics(stats, daily):
+    text = (
         f"📊 Статистика пользователей:\n\n"
         f"👥 Всего пользователей: {stats['total_users']}\n"
         f"🟢 Активных пользователей: {stats['active_users']}\n"
         f"🔴 Заблокированных пользователей: {stats['blocked_users']}\n"
         f"🎲 Количество созданных сессий: {stats['total_sessions']}\n"
-        f"📈 Среднее количество сессий на пользователя: {stats['avg_sessions_per_user']:.2f}"
+        f"📈 Среднее количество сессий на пользователя: {stats['avg_sessions_per_user']:.2f}\n"
+        f"🙋 Участий в сессиях: {stats['participations']}\n"
+        f"✅ Подтверждений: {stats['confirmed']}, ❌ отказов: {stats['declined']} "
+        f"({stats['confirm_rate']:.0%} подтверждений)"
     )
+    if daily:
+        text += "\n\n📅 По дням (сессий / записей / подтверждений):\n"
+        for day in daily:
+            answered = day['confirmed'] + day['declined']
+            rate = f"{day['confirmed'] / answered:.0%}" if answered else "—"
+            text += f"{day['day']}: {day['sessions_created']} / {day['joins']} / {rate}\n"
+    return text
 
 
 @router.callback_query(F.data == "user_statistics")
 async def show_user_statistics(callback: CallbackQuery):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} requested user statistics")
+    admin_logger.info("Admin %s requested user statistics", admin_id)
     if admin_id != config.admin_user_id:
-        admin_logger.warning(f"Unauthorized access attempt to user statistics by user {admin_id}")
+        admin_logger.warning("Unauthorized access attempt to user statistics by user %s", admin_id)
         await callback.edit_text("У вас нет доступа к этой функции.", show_alert=True)
         return
 
     stats = await get_user_statistics()
-    stats_text = format_user_statistics(stats)
+    daily = await get_daily_statistics(config.stats_days)
+    stats_text = format_user_statistics(stats, daily)
 
     await callback.message.edit_text(
         stats_text,
         reply_markup=get_user_statistics_keyboard()
     )
-    admin_logger.info(f"User statistics displayed for admin {admin_id}")
+    admin_logger.info("User statistics displayed for admin %s", admin_id)
 
 
 @router.callback_query(F.data == "refresh_statistics")
 async def refresh_statistics(callback: CallbackQuery):
     admin_id = callback.from_user.id
-    admin_logger.info(f"Admin {admin_id} requested to refresh user statistics")
+    admin_logger.info("Admin %s requested to refresh user statistics", admin_id)
     await show_user_statistics(callback)
-    admin_logger.info(f"User statistics refreshed for admin {admin_id}")
+    admin_logger.info("User statistics refreshed for admin %s", admin_id)
@@ -1,149 +1,181 @@
-import asyncio
 from aiogram import F, Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
-from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.callbacks.menu import show_my_sessions
 from app.handlers.game_session import router
 from app.handlers.help import get_back_menu_keyboard
-from app.services.database import (get_sessions,
+from app.services.database import (get_sessions_page,
                                    leave_session,
                                    join_session,
                                    remove_participant,
-                                   get_session_participants,
-                                   get_session_info,
+                                   get_session_snapshot,
                                    delete_session,
-                                   get_user_session_history, add_user_session_event)
+                                   get_user_session_history, add_user_session_event,
+                                   JOIN_JOINED, JOIN_ALREADY_JOINED, JOIN_FULL, JOIN_NOT_FOUND)
 
 from app.states.game_sassion import SessionCreation
 from app.utils.message_cleaner import message_cleaner
-from app.keyboards.sessions import get_sessions_list_keyboard
+from app.keyboards.sessions import get_sessions_list_keyboard, get_history_keyboard, get_session_card_keyboard
 from app.services.database import update_session_confirmation
+from app.services.delivery import delivery_queue
+from app.services.session_snapshot import SessionSnapshot
+from app.services.scheduler import reminder_scheduler
 from app.keyboards.menu import get_main_menu_keyboard, back_to_main_menu_keyboard
 from app.utils.logger import session_logger
+from app.config_reader import config
 
 @router.callback_query(F.data.startswith("game_"))
 async def process_game_selection(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     game = callback.data.split("_")[1]
-    session_logger.info(f"User {user_id} selected game: {game}")
+    session_logger.info("User %s selected game: %s", user_id, game)
     if game == "other":
         response = await callback.message.answer("Введите название игры:")
         await message_cleaner.add_message_to_delete(user_id, response)
         await state.set_state(SessionCreation.choosing_game)
-        session_logger.info(f"User {user_id} prompted to enter custom game name")
+        session_logger.info("User %s prompted to enter custom game name", user_id)
     else:
         await state.update_data(game=game)
         response = await callback.message.answer("Выберите дату проведения игры (в формате ГГГГ-ММ-ДД):")
         await message_cleaner.add_message_to_delete(user_id, response)
         await state.set_state(SessionCreation.setting_date)
-        session_logger.info(f"User {user_id} prompted to enter date for game {game}")
+        session_logger.info("User %s prompted to enter date for game %s", user_id, game)
 
 
 def format_sessions_list(sessions):
-    text = "Доступные сессии:\n\n"
+    lines = ["Доступные сессии:\n\n"]
     for session in sessions:
-        session_id, game, date, time, max_players, current_players, creator_name = session
-        text += (f"ID: {session_id}, Игра: {game}\n"
-                 f"Дата: {date}, Время: {time}\n"
-                 f"Игроки: {current_players}/{max_players}\n"
-                 f"Создатель: {creator_name}\n"
-                 f"-------------------\n")
-    return text
+        lines.append(f"ID: {session['id']}, Игра: {session['game']}\n"
+                     f"Дата: {session['date']}, Время: {session['time']}\n"
+                     f"Игроки: {session['current_players']}/{session['max_players']}\n"
+                     f"Создатель: {session['creator_name']}\n"
+                     f"-------------------\n")
+    return "".join(lines)
 
 
-@router.callback_query(F.data == "list_sessions")
-async def show_sessions(callback: CallbackQuery):
+async def show_sessions_page(callback: CallbackQuery, after=None, before=None):
     user_id = callback.from_user.id
-    session_logger.info(f"User {user_id} requested session list")
-    sessions = await get_sessions()
+    page_size = config.sessions_page_size
+    sessions, has_more = await get_sessions_page(after=after, before=before, limit=page_size)
+    if not sessions and (after is not None or before is not None):
+        # Сессии страницы уже начались или удалены - начинаем сначала
+        after = before = None
+        sessions, has_more = await get_sessions_page(limit=page_size)
     if not sessions:
         text_message = "Нет доступных сессий."
-        session_logger.info(f"No available sessions for user {user_id}")
+        session_logger.info("No available sessions for user %s", user_id)
         await callback.message.edit_text(
             text_message,
             reply_markup=back_to_main_menu_keyboard(user_id)
         )
         return
 
+    if before is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+
     text = format_sessions_list(sessions)
-    keyboard = get_sessions_list_keyboard(sessions)
+    keyboard = get_sessions_list_keyboard(sessions, has_prev, has_next)
 
     await callback.message.edit_text(text, reply_markup=keyboard)
-    session_logger.info(f"Session list displayed for user {user_id}")
+    session_logger.info("Session list page displayed for user %s", user_id)
 
 
-@router.callback_query(F.data.startswith("session_info_"))
-async def show_session_info(callback: CallbackQuery):
-    user_id = callback.from_user.id
-    session_id = int(callback.data.split("_")[-1])
-    session_logger.info(f"User {user_id} requested info for session {session_id}")
+@router.callback_query(F.data == "list_sessions")
+async def show_sessions(callback: CallbackQuery):
+    session_logger.info("User %s requested session list", callback.from_user.id)
+    await show_sessions_page(callback)
 
-    session = await get_session_info(session_id)  # Предполагаем, что эта функция возвращает полную информацию о сессии
 
-    if not session:
-        session_logger.warning(f"Session {session_id} not found for user {user_id}")
-        await callback.answer("Сессия не найдена.", show_alert=True)
-        return
+@router.callback_query(F.data.startswith("sessions_prev_") | F.data.startswith("sessions_next_"))
+async def turn_sessions_page(callback: CallbackQuery):
+    _, direction, starts_at, session_id = callback.data.split("_")
+    cursor = (int(starts_at), int(session_id))
+    session_logger.info("User %s turned session list %s from %s", callback.from_user.id, direction, cursor)
+    if direction == "next":
+        await show_sessions_page(callback, after=cursor)
+    else:
+        await show_sessions_page(callback, before=cursor)
 
-    participants = await get_session_participants(session_id)
 
+def build_session_card(session: SessionSnapshot, user_id: int):
     text = (f"Информация о сессии:\n"
-            f"ID: {session_id}\n"
-            f"Игра: {session['game']}\n"
-            f"Дата: {session['date']}, Время: {session['time']}\n"
-            f"Игроки: {len(participants)}/{session['max_players']}\n"
-            f"Создатель: {session['creator_name']}\n\n"
+            f"ID: {session.id}\n"
+            f"Игра: {session.game}\n"
+            f"Дата: {session.date}, Время: {session.time}\n"
+            f"Игроки: {session.current_players}/{session.max_players}\n"
+            f"Создатель: {session.creator_name}\n\n"
             f"Участники:\n")
 
-    for participant in participants:
-        text += f"- {participant['name']} (@{participant['username'] or 'Нет username'})\n"
+    for participant in session.participants:
+        text += f"- {participant.name} (@{participant.username or 'Нет username'})\n"
 
-    builder = InlineKeyboardBuilder()
+    is_participant = session.is_participant(user_id)
+    is_creator = session.creator_id == user_id  # Теперь мы сравниваем user_id
 
-    is_participant = any(participant['id'] == user_id for participant in participants)
-    is_creator = session['creator_id'] == user_id  # Теперь мы сравниваем user_id
+    return text, get_session_card_keyboard(session.id, is_creator, is_participant)
 
-    if is_creator:
-        builder.button(text="Удалить сессию", callback_data=f"delete_session_{session_id}")
-    elif is_participant:
-        builder.button(text="Выйти из сессии", callback_data=f"leave_{session_id}")
-    else:
-        builder.button(text="Присоединиться", callback_data=f"join_{session_id}")
 
-    builder.button(text="Назад к списку", callback_data="list_sessions")
-    builder.adjust(1)
+@router.callback_query(F.data.startswith("session_info_"))
+async def show_session_info(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    session_id = int(callback.data.split("_")[-1])
+    session_logger.info("User %s requested info for session %s", user_id, session_id)
+
+    session = await get_session_snapshot(session_id)
+
+    if not session:
+        session_logger.warning("Session %s not found for user %s", session_id, user_id)
+        await callback.answer("Сессия не найдена.", show_alert=True)
+        return
 
-    await callback.message.edit_text(text, reply_markup=builder.as_markup())
-    session_logger.info(f"Session info displayed for user {user_id}, session {session_id}")
+    text, keyboard = build_session_card(session, user_id)
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    session_logger.info("Session info displayed for user %s, session %s", user_id, session_id)
 
 @router.callback_query(F.data.startswith("leave_"))
 async def leave_game_session(callback: CallbackQuery):
     user_id = callback.from_user.id
     session_id = int(callback.data.split("_")[1])
-    session_logger.info(f"User {user_id} attempting to leave session {session_id}")
+    session_logger.info("User %s attempting to leave session %s", user_id, session_id)
     await leave_session(session_id, user_id)
     await callback.answer("Вы успешно вышли из сессии!", show_alert=True)
-    session_logger.info(f"User {user_id} left session {session_id}")
+    session_logger.info("User %s left session %s", user_id, session_id)
     await show_session_info(callback)
 
 
+JOIN_ANSWERS = {
+    JOIN_JOINED: "Вы успешно присоединились к сессии!",
+    JOIN_ALREADY_JOINED: "Вы уже участвуете в этой сессии.",
+    JOIN_FULL: "В сессии нет свободных мест.",
+    JOIN_NOT_FOUND: "Сессия не найдена.",
+}
+
+
 @router.callback_query(F.data.startswith("join_"))
 async def join_game_session(callback: CallbackQuery):
     user_id = callback.from_user.id
     session_id = int(callback.data.split("_")[1])
-    session_logger.info(f"User {user_id} attempting to join session {session_id}")
-    await join_session(session_id, user_id)
-    await callback.answer("Вы успешно присоединились к сессии!", show_alert=True)
-    session_logger.info(f"User {user_id} joined session {session_id}")
-    await show_session_info(callback)
+    session_logger.info("User %s attempting to join session %s", user_id, session_id)
+    status, snapshot = await join_session(session_id, user_id)
+    if status == JOIN_JOINED:
+        reminder_scheduler.participants_changed(session_id)
+    await callback.answer(JOIN_ANSWERS[status], show_alert=True)
+    session_logger.info("User %s join attempt for session %s: %s", user_id, session_id, status)
+    if snapshot is None:
+        return
+
+    # Карточку перерисовываем по снимку, который вернул join_session, без повторных запросов
+    text, keyboard = build_session_card(snapshot, user_id)
+    await callback.message.edit_text(text, reply_markup=keyboard)
 
 
 @router.callback_query(F.data == "back_to_menu")
 async def back_to_menu(callback: CallbackQuery):
     user_id = callback.from_user.id
-    session_logger.info(f"User {user_id} returning to main menu")
+    session_logger.info("User %s returning to main menu", user_id)
     await callback.message.edit_text("Главное меню:", reply_markup=get_main_menu_keyboard(user_id))
 
 
@@ -154,7 +186,7 @@ async def confirm_session(callback: CallbackQuery, bot: Bot):
     user_name = callback.from_user.full_name
     username = callback.from_user.username
 
-    session_logger.info(f"User {user_id} confirming participation in session {session_id}")
+    session_logger.info("User %s confirming participation in session %s", user_id, session_id)
     await update_session_confirmation(session_id, user_id, "confirmed")
     await add_user_session_event(user_id, session_id, "confirmed")
 
@@ -166,35 +198,25 @@ async def confirm_session(callback: CallbackQuery, bot: Bot):
     )
     await message_cleaner.add_message_to_delete(user_id, new_message)
 
-    session_info = await get_session_info(session_id)
-    participants = await get_session_participants(session_id)
+    session = await get_session_snapshot(session_id)
+    if session is None:
+        session_logger.warning("Session %s not found for user %s", session_id, user_id)
+        await callback.answer()
+        return
 
     notification_text = (
         f"Пользователь {user_name} (@{username or 'Нет username'}) подтвердил участие в сессии:\n"
-        f"Игра: {session_info['game']}\n"
-        f"Дата: {session_info['date']}\n"
-        f"Время: {session_info['time']}"
+        f"Игра: {session.game}\n"
+        f"Дата: {session.date}\n"
+        f"Время: {session.time}"
     )
 
-    for participant in participants:
-        if participant['id'] != user_id:
-            try:
-                confirm_response = await bot.send_message(participant['id'], notification_text)
-                session_logger.info(f"Notification sent to user {participant['id']} about {user_id} confirming session {session_id}")
-                await message_cleaner.add_message_to_delete(callback.from_user.id, confirm_response)
-                await asyncio.sleep(5)
-                await message_cleaner.delete_previous_messages(bot, user_id)
-
-                new_message = await callback.message.answer(
-                    "Вот главное меню:",
-                    reply_markup=get_main_menu_keyboard(user_id)
-                )
-                await message_cleaner.add_message_to_delete(user_id, new_message)
-
-            except Exception as e:
-                session_logger.error(f"Failed to send notification to user {participant['id']}: {e}", exc_info=True)
-
-    session_logger.info(f"User {user_id} confirmed participation in session {session_id}. Notifications sent.")
+    # Рассылка идет в фоне, хендлер не ждет отправки
+    for participant in session.participants:
+        if participant.id != user_id:
+            delivery_queue.enqueue(participant.id, notification_text)
+
+    session_logger.info("User %s confirmed participation in session %s. Notifications queued.", user_id, session_id)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("decline_"))
@@ -204,7 +226,7 @@ async def decline_session(callback: CallbackQuery, bot: Bot):
     user_name = callback.from_user.full_name
     username = callback.from_user.username
 
-    session_logger.info(f"User {user_id} declining participation in session {session_id}")
+    session_logger.info("User %s declining participation in session %s", user_id, session_id)
 
     await callback.message.delete()
     await message_cleaner.delete_previous_messages(bot, user_id)
@@ -219,35 +241,25 @@ async def decline_session(callback: CallbackQuery, bot: Bot):
     )
     await message_cleaner.add_message_to_delete(user_id, new_message)
 
-    session_info = await get_session_info(session_id)
-    participants = await get_session_participants(session_id)
+    session = await get_session_snapshot(session_id)
+    if session is None:
+        session_logger.warning("Session %s not found for user %s", session_id, user_id)
+        await callback.answer()
+        return
 
     notification_text = (
         f"Пользователь {user_name} (@{username or 'Нет username'}) отклонил участие и был удален из сессии:\n"
-        f"Игра: {session_info['game']}\n"
-        f"Дата: {session_info['date']}\n"
-        f"Время: {session_info['time']}"
+        f"Игра: {session.game}\n"
+        f"Дата: {session.date}\n"
+        f"Время: {session.time}"
     )
 
-    for participant in participants:
-        if participant['id'] != user_id:
-            try:
-                decline_response = await bot.send_message(participant['id'], notification_text)
-                session_logger.info(f"Notification sent to user {participant['id']} about {user_id} declining session {session_id}")
-                await message_cleaner.add_message_to_delete(callback.from_user.id, decline_response)
-                await asyncio.sleep(5)
-                await message_cleaner.delete_previous_messages(bot, user_id)
-
-                new_message = await callback.message.answer(
-                    "Вот главное меню:",
-                    reply_markup=get_main_menu_keyboard(user_id)
-                )
-                await message_cleaner.add_message_to_delete(user_id, new_message)
-
-            except Exception as e:
-                session_logger.error(f"Failed to send notification to user {participant['id']}: {e}", exc_info=True)
-
-    session_logger.info(f"User {user_id} declined participation in session {session_id}. Notifications sent.")
+    # Рассылка идет в фоне, хендлер не ждет отправки
+    for participant in session.participants:
+        if participant.id != user_id:
+            delivery_queue.enqueue(participant.id, notification_text)
+
+    session_logger.info("User %s declined participation in session %s. Notifications queued.", user_id, session_id)
     await callback.answer()
 
 
@@ -255,46 +267,103 @@ async def decline_session(callback: CallbackQuery, bot: Bot):
 async def delete_game_session(callback: CallbackQuery):
     user_id = callback.from_user.id
     session_id = int(callback.data.split("_")[-1])
-    session_logger.info(f"User {user_id} attempting to delete session {session_id}")
+    session_logger.info("User %s attempting to delete session %s", user_id, session_id)
 
     success = await delete_session(session_id, user_id)
 
     if success:
+        reminder_scheduler.cancel(session_id)
         await add_user_session_event(user_id, session_id, "deleted")
         await callback.answer("Сессия успешно удалена.", show_alert=True)
         await show_my_sessions(callback)
-        session_logger.info(f"Session {session_id} successfully deleted by user {user_id}")
+        session_logger.info("Session %s successfully deleted by user %s", session_id, user_id)
     else:
         await callback.answer("Не удалось удалить сессию. Возможно, у вас нет прав на это действие.", show_alert=True)
-        session_logger.warning(f"Failed to delete session {session_id} by user {user_id}")
+        session_logger.warning("Failed to delete session %s by user %s", session_id, user_id)
 
 
-@router.callback_query(F.data == "session_history")
-async def show_session_history(callback: CallbackQuery):
+HISTORY_EVENT_TEXTS = {
+    "confirmed": "подтвердил",
+    "declined": "отклонил",
+    "deleted": "удалил"
+}
+
+
+def format_history(events, session_id=None, event_type=None):
+    title = "История событий"
+    if session_id is not None:
+        title += f" сессии {session_id}"
+    if not events:
+        return f"{title}:\n\nСобытий не найдено."
+    lines = [f"{title}:\n"]
+    for event in events:
+        event_type_text = HISTORY_EVENT_TEXTS.get(event['event_type'], event['event_type'])
+        lines.append(f"{event['timestamp'][5:16]} - {event['user_name']} {event_type_text} "
+                     f"{event['game']} (ID: {event['session_id']})")
+    return "\n".join(lines)
+
+
+async def show_history_page(callback: CallbackQuery, state: FSMContext, older_than=None, newer_than=None,
+                            page=None):
     user_id = callback.from_user.id
-    session_logger.info(f"User {user_id} requested session history")
+    # Фильтры истории хранятся в данных FSM, листание страниц их сохраняет
+    data = await state.get_data()
+    session_id, event_type = data.get("history_session"), data.get("history_type")
+    # page - уже загруженная первая страница без фильтров
+    if page is None:
+        page = await get_user_session_history(user_id, older_than=older_than, newer_than=newer_than,
+                                              session_id=session_id, event_type=event_type,
+                                              limit=config.history_page_size)
+    events, has_more = page
+    if newer_than is not None:
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = older_than is not None, has_more
+
+    text = format_history(events, session_id, event_type)
+    keyboard = get_history_keyboard(events, has_newer, has_older, session_id, event_type)
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    session_logger.info("Session history page displayed for user %s", user_id)
 
-    history = await get_user_session_history(user_id)
 
-    if not history:
+@router.callback_query(F.data == "session_history")
+async def show_session_history(callback: CallbackQuery, state: FSMContext):
+    user_id = callback.from_user.id
+    session_logger.info("User %s requested session history", user_id)
+
+    page = await get_user_session_history(user_id, limit=config.history_page_size)
+    if not page[0]:
         await callback.answer("У вас пока нет истории событий.", show_alert=True)
         return
 
-    history_text = ""
-    for event in history:
-        event_type_text = {
-            "confirmed": "подтвердил ",
-            "declined": "отклонил ",
-            "deleted": "удалил"
-        }.get(event['event_type'], event['event_type'])
+    await state.update_data(history_session=None, history_type=None)
+    await show_history_page(callback, state, page=page)
 
-        history_text += (f"{event['timestamp'][11:16]} - {event['user_name']} {event_type_text} "
-                         f"(ID: {event['session_id']})\n")
 
-    # Разбиваем историю на части по 200 символов
-    max_length = 200
-    history_parts = [history_text[i:i+max_length] for i in range(0, len(history_text), max_length)]
+@router.callback_query(F.data.startswith("history_session_"))
+async def filter_history_by_session(callback: CallbackQuery, state: FSMContext):
+    value = callback.data.split("_")[-1]
+    session_id = None if value == "all" else int(value)
+    session_logger.info("User %s filtered history by session %s", callback.from_user.id, session_id)
+    await state.update_data(history_session=session_id)
+    await show_history_page(callback, state)
 
-    await callback.answer(history_parts[0], show_alert=True)
 
-    session_logger.info(f"Session history displayed for user {user_id}")
+@router.callback_query(F.data.startswith("history_type_"))
+async def filter_history_by_type(callback: CallbackQuery, state: FSMContext):
+    value = callback.data.split("_")[-1]
+    event_type = None if value == "all" else value
+    session_logger.info("User %s filtered history by event type %s", callback.from_user.id, event_type)
+    await state.update_data(history_type=event_type)
+    await show_history_page(callback, state)
+
+
+@router.callback_query(F.data.startswith("history_older_") | F.data.startswith("history_newer_"))
+async def turn_history_page(callback: CallbackQuery, state: FSMContext):
+    _, direction, ts, event_id = callback.data.split("_")
+    cursor = (int(ts), int(event_id))
+    session_logger.info("User %s turned history %s from %s", callback.from_user.id, direction, cursor)
+    if direction == "older":
+        await show_history_page(callback, state, older_than=cursor)
+    else:
+        await show_history_page(callback, state, newer_than=cursor)
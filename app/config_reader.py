@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -7,6 +8,89 @@ class Settings(BaseSettings):
     # для конфиденциальных данных, например, токена бота
     bot_token: SecretStr
     admin_user_id: int
+    # Способ получения обновлений: 'polling' или 'webhook'.
+    # Для вебхука нужен внешний адрес; сервер слушает host:port, а workers
+    # ограничивает число обновлений, обрабатываемых одновременно
+    bot_mode: str = 'polling'
+    webhook_base_url: Optional[str] = None
+    webhook_path: str = '/webhook'
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = '0.0.0.0'
+    webhook_port: int = 8080
+    webhook_workers: int = 16
+    # Настройки хранилища SQLite: число соединений на чтение, режим журнала,
+    # прагмы и окно группировки записей в одну транзакцию
+    db_readers: int = 4
+    db_journal_mode: str = 'WAL'
+    db_synchronous: str = 'NORMAL'
+    db_busy_timeout_ms: int = 5000
+    db_cache_size_kib: int = 16384
+    db_mmap_size: int = 256 * 1024 * 1024
+    db_write_batch_ms: float = 5
+    db_write_batch_size: int = 100
+    # Ограничения Telegram на отправку: сообщений в секунду всего и в один чат,
+    # число одновременных запросов и попыток при рассылке
+    telegram_global_rate: float = 30
+    telegram_chat_rate: float = 1
+    telegram_chat_burst: int = 3
+    broadcast_concurrency: int = 10
+    broadcast_max_retries: int = 3
+    # Уведомления одному получателю за это время объединяются в одно сообщение
+    delivery_merge_window: float = 2
+    # За сколько часов до начала сессии отправлять напоминание
+    reminder_hours_before: float = 2
+    # FSM-хранилище: размер кэша в памяти, период записи в базу и время жизни
+    # незавершенных сценариев
+    fsm_cache_size: int = 10000
+    fsm_flush_interval: float = 1
+    fsm_ttl_hours: float = 24
+    # Ограничения списка сообщений для удаления: на пользователя и всего
+    cleaner_max_per_user: int = 50
+    cleaner_max_total: int = 10000
+    cleaner_flush_interval: float = 1
+    # Кэш списка сессий и карточек сессий: число записей и время жизни в секундах
+    session_cache_size: int = 1000
+    session_cache_ttl: float = 60
+    # Число сессий на одной странице списка
+    sessions_page_size: int = 5
+    # Число событий на одной странице истории
+    history_page_size: int = 10
+    # Список пользователей в админке: размер страницы и размер порции при выгрузке в CSV
+    users_page_size: int = 20
+    users_export_chunk_size: int = 1000
+    # Очистка базы: как часто запускать, через сколько дней после начала сессия уходит
+    # в архив, размер порции переноса и сколько свободных страниц возвращать за запуск
+    retention_interval_hours: float = 6
+    archive_after_days: float = 7
+    retention_batch_size: int = 500
+    vacuum_pages: int = 1000
+    # За сколько последних дней показывать сводку в статистике
+    stats_days: int = 7
+    # Логи: общий уровень и уровни отдельных логгеров (в .env - JSON, например
+    # LOG_LEVELS={"database": "DEBUG"}). Строку об обработке обновления пишет логгер
+    # 'update', поэтому такая же строка aiogram по умолчанию скрыта
+    log_level: str = 'INFO'
+    log_levels: Dict[str, str] = {'aiogram.event': 'WARNING'}
+    # Файл логов с ротацией, копия в консоль и необязательный вывод в JSON lines
+    # с id обновления и задержкой
+    log_file: str = 'logs/main.log'
+    log_console: bool = True
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_json: bool = False
+    log_json_file: str = 'logs/main.jsonl'
+    # Повторные нажатия той же кнопки: сколько секунд после обработки первого нажатия
+    # они отбрасываются и сколько дубликат ждет ответа первого нажатия
+    callback_debounce_window: float = 1
+    callback_coalesce_timeout: float = 10
+    # Профилирование SQL по обновлениям (только для отладки): после каждого обновления
+    # логгер 'profiler' пишет все его запросы, повторы и запросы дольше db_profile_slow_ms
+    db_profile: bool = False
+    db_profile_slow_ms: float = 20
+    # Метрики в формате Prometheus на локальном адресе http://host:port/metrics
+    metrics_enabled: bool = True
+    metrics_host: str = '127.0.0.1'
+    metrics_port: int = 9091
     # Начиная со второй версии pydantic, настройки класса настроек задаются
     # через model_config
     # В данном случае будет использоваться файла .env, который будет прочитан
@@ -2,10 +2,11 @@ from aiogram import Router
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from app.states.admin import AdminStates
-from app.services.database import block_user, unblock_user
+from app.config_reader import config
+from app.services.database import block_user, unblock_user, get_users_page
 from app.utils.logger import admin_logger
 from app.utils.message_cleaner import message_cleaner
-from app.keyboards.admin import get_user_management_keyboard
+from app.keyboards.admin import get_user_management_keyboard, get_users_list_keyboard
 
 router = Router()
 
@@ -13,13 +14,13 @@ router = Router()
 @router.message(AdminStates.waiting_for_user_id)
 async def process_user_id_for_block(message: Message, state: FSMContext):
     admin_id = message.from_user.id
-    admin_logger.info(f"Processing user ID for block. Admin: {admin_id}, Input: {message.text}")
+    admin_logger.info("Processing user ID for block. Admin: %s, Input: %s", admin_id, message.text)
 
     # Добавляем сообщение пользователя в список для удаления
     await message_cleaner.add_user_message(message)
 
     if not message.text.isdigit():
-        admin_logger.warning(f"Invalid user ID input: {message.text}")
+        admin_logger.warning("Invalid user ID input: %s", message.text)
         response = await message.answer("Пожалуйста, введите корректный ID пользователя (только цифры).")
         await message_cleaner.add_message_to_delete(admin_id, response)
         return
@@ -44,11 +45,11 @@ async def process_block_reason(message: Message, state: FSMContext):
     # Добавляем сообщение пользователя (причину блокировки) в список для удаления
     await message_cleaner.add_user_message(message)
 
-    admin_logger.info(f"Processing block reason for user {user_id}. Admin: {admin_id}, Reason: {reason}")
+    admin_logger.info("Processing block reason for user %s. Admin: %s, Reason: %s", user_id, admin_id, reason)
 
     try:
         await block_user(user_id, reason)
-        admin_logger.info(f"User {user_id} successfully blocked by admin {admin_id}. Reason: {reason}")
+        admin_logger.info("User %s successfully blocked by admin %s. Reason: %s", user_id, admin_id, reason)
         await state.clear()
 
         # Удаляем предыдущие сообщения
@@ -58,7 +59,7 @@ async def process_block_reason(message: Message, state: FSMContext):
                                         reply_markup=get_user_management_keyboard())
         await message_cleaner.add_message_to_delete(admin_id, response)
     except Exception as e:
-        admin_logger.error(f"Error occurred while blocking user {user_id}: {e}", exc_info=True)
+        admin_logger.error("Error occurred while blocking user %s: %s", user_id, e, exc_info=True)
         response = await message.answer("Произошла ошибка при блокировке пользователя. Пожалуйста, попробуйте еще раз.")
         await message_cleaner.add_message_to_delete(admin_id, response)
 
@@ -66,13 +67,13 @@ async def process_block_reason(message: Message, state: FSMContext):
 @router.message(AdminStates.waiting_for_user_id_unblock)
 async def process_user_id_for_unblock(message: Message, state: FSMContext):
     admin_id = message.from_user.id
-    admin_logger.info(f"Processing user ID for unblock. Admin: {admin_id}, Input: {message.text}")
+    admin_logger.info("Processing user ID for unblock. Admin: %s, Input: %s", admin_id, message.text)
 
     # Добавляем сообщение пользователя в список для удаления
     await message_cleaner.add_user_message(message)
 
     if not message.text.isdigit():
-        admin_logger.warning(f"Invalid user ID input for unblock: {message.text}")
+        admin_logger.warning("Invalid user ID input for unblock: %s", message.text)
         response = await message.answer("Пожалуйста, введите корректный ID пользователя (только цифры).")
         await message_cleaner.add_message_to_delete(admin_id, response)
         return
@@ -81,7 +82,7 @@ async def process_user_id_for_unblock(message: Message, state: FSMContext):
 
     try:
         await unblock_user(user_id)
-        admin_logger.info(f"User {user_id} successfully unblocked by admin {admin_id}")
+        admin_logger.info("User %s successfully unblocked by admin %s", user_id, admin_id)
         await state.clear()
 
         # Удаляем предыдущие сообщения, включая сообщение пользователя
@@ -91,6 +92,46 @@ async def process_user_id_for_unblock(message: Message, state: FSMContext):
                                         reply_markup=get_user_management_keyboard())
         await message_cleaner.add_message_to_delete(admin_id, response)
     except Exception as e:
-        admin_logger.error(f"Error occurred while unblocking user {user_id}: {e}", exc_info=True)
+        admin_logger.error("Error occurred while unblocking user %s: %s", user_id, e, exc_info=True)
         response = await message.answer("Произошла ошибка при разблокировке пользователя. Пожалуйста, попробуйте еще раз.")
-        await message_cleaner.add_message_to_delete(admin_id, response)
\ No newline at end of file
+        await message_cleaner.add_message_to_delete(admin_id, response)
+
+
+async def render_users_page(query: str = None, after: int = None, before: int = None):
+    users, has_more = await get_users_page(after=after, before=before, query=query,
+                                           limit=config.users_page_size)
+    if before is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+
+    title = f"Пользователи по запросу «{query}»:" if query else "Список пользователей:"
+    if users:
+        lines = [f"ID: {user['id']}, Имя: {user['name']}, Возраст: {user['age']}"
+                 f"{' 🚫' if user['is_blocked'] else ''}" for user in users]
+        text = f"{title}\n\n" + "\n".join(lines)
+    else:
+        text = f"{title}\n\nНикого не найдено."
+    return text, get_users_list_keyboard(users, has_prev, has_next, has_query=bool(query))
+
+
+@router.message(AdminStates.waiting_for_user_search)
+async def process_user_search(message: Message, state: FSMContext):
+    admin_id = message.from_user.id
+    query = (message.text or "").strip()
+    admin_logger.info("Admin %s searching users by: %s", admin_id, query)
+
+    await message_cleaner.add_user_message(message)
+    if not query:
+        response = await message.answer("Введите ID или начало имени пользователя.")
+        await message_cleaner.add_message_to_delete(admin_id, response)
+        return
+
+    # Запрос остается в данных FSM, чтобы листание страниц шло по результатам поиска
+    await state.set_state(None)
+    await state.update_data(users_query=query)
+    await message_cleaner.delete_previous_messages(message.bot, admin_id)
+
+    text, keyboard = await render_users_page(query)
+    response = await message.answer(text, reply_markup=keyboard)
+    await message_cleaner.add_message_to_delete(admin_id, response)
@@ -14,32 +14,33 @@ async def delete_message_with_delay(message: Message, delay: int):
     await asyncio.sleep(delay)
     try:
         await message.delete()
-        common_logger.info(f"Deleted reminder message {message.message_id} after {delay} seconds")
+        common_logger.info("Deleted reminder message %s after %s seconds", message.message_id, delay)
     except TelegramBadRequest as e:
-        common_logger.error(f"Failed to delete reminder message {message.message_id}: {e}")
+        common_logger.error("Failed to delete reminder message %s: %s", message.message_id, e)
     except Exception as e:
-        common_logger.error(f"Unexpected error when deleting reminder message {message.message_id}: {e}")
+        common_logger.error("Unexpected error when deleting reminder message %s: %s", message.message_id, e)
 
 
 @router.message(~Command("start"))
 async def delete_irrelevant_message(message: Message):
     user_id = message.from_user.id
-    common_logger.info(f"Received message from user {user_id}: {message.text}")
-    common_logger.info(f"Message ID: {message.message_id}, Chat ID: {message.chat.id}")
+    common_logger.info("Received message from user %s: %s", user_id, message.text)
+    common_logger.info("Message ID: %s, Chat ID: %s", message.message_id, message.chat.id)
 
     try:
         await message.delete()
-        common_logger.info(f"Successfully deleted message {message.message_id} from user {user_id}")
+        common_logger.info("Successfully deleted message %s from user %s", message.message_id, user_id)
     except TelegramBadRequest as e:
-        common_logger.error(f"TelegramBadRequest when deleting message {message.message_id} from user {user_id}: {e}")
+        common_logger.error("TelegramBadRequest when deleting message %s from user %s: %s",
+                            message.message_id, user_id, e)
     except Exception as e:
-        common_logger.error(f"Unexpected error when deleting message {message.message_id} from user {user_id}: {e}")
+        common_logger.error("Unexpected error when deleting message %s from user %s: %s", message.message_id, user_id, e)
 
     try:
         reminder = await message.answer("Пожалуйста, используйте кнопки меню.")
-        common_logger.info(f"Sent reminder (message ID: {reminder.message_id}) to user {user_id}")
+        common_logger.info("Sent reminder (message ID: %s) to user %s", reminder.message_id, user_id)
 
         # Запускаем задачу на удаление сообщения-напоминания через 2 секунд
         asyncio.create_task(delete_message_with_delay(reminder, 3))
     except Exception as e:
-        common_logger.error(f"Failed to send reminder to user {user_id}: {e}")
\ No newline at end of file
+        common_logger.error("Failed to send reminder to user %s: %s", user_id, e)
\ No newline at end of file
@@ -14,7 +14,7 @@ router = Router()
 @router.callback_query(F.data == "edit_profile")
 async def start_edit_profile(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    profile_logger.info(f"User {user_id} started profile editing")
+    profile_logger.info("User %s started profile editing", user_id)
     response = await callback.message.edit_text(
         "Что вы хотите изменить?",
         reply_markup=get_edit_profile_keyboard()
@@ -25,7 +25,7 @@ async def start_edit_profile(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(EditProfileStates.choosing_field, F.data == "edit_name")
 async def edit_name(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    profile_logger.info(f"User {user_id} chose to edit name")
+    profile_logger.info("User %s chose to edit name", user_id)
     await message_cleaner.delete_previous_messages(callback.bot, user_id)
     response = await callback.message.answer("Введите новое имя:")
     await message_cleaner.add_message_to_delete(user_id, response)
@@ -34,7 +34,7 @@ async def edit_name(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(EditProfileStates.choosing_field, F.data == "edit_age")
 async def edit_age(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    profile_logger.info(f"User {user_id} chose to edit age")
+    profile_logger.info("User %s chose to edit age", user_id)
     await message_cleaner.delete_previous_messages(callback.bot, user_id)
     response = await callback.message.answer("Введите новый возраст:")
     await message_cleaner.add_message_to_delete(user_id, response)
@@ -43,7 +43,7 @@ async def edit_age(callback: CallbackQuery, state: FSMContext):
 @router.message(EditProfileStates.editing_name)
 async def process_new_name(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    profile_logger.info(f"User {user_id} submitted new name: {message.text}")
+    profile_logger.info("User %s submitted new name: %s", user_id, message.text)
     await message_cleaner.add_user_message(message)
     if is_valid_russian_name(message.text):
         await update_user_info(user_id, name=message.text)
@@ -58,7 +58,7 @@ async def process_new_name(message: Message, state: FSMContext):
 @router.message(EditProfileStates.editing_age)
 async def process_new_age(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    profile_logger.info(f"User {user_id} submitted new age: {message.text}")
+    profile_logger.info("User %s submitted new age: %s", user_id, message.text)
     await message_cleaner.add_user_message(message)
     if is_valid_age(message.text):
         await update_user_info(user_id, age=int(message.text))
@@ -73,7 +73,7 @@ async def process_new_age(message: Message, state: FSMContext):
 @router.callback_query(F.data == "cancel_edit")
 async def cancel_edit(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    profile_logger.info(f"User {user_id} cancelled profile editing")
+    profile_logger.info("User %s cancelled profile editing", user_id)
     await message_cleaner.delete_previous_messages(callback.bot, user_id)
     await state.clear()
     response = await callback.message.answer("Редактирование отменено.", reply_markup=get_main_menu_keyboard(user_id))
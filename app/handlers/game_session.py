@@ -2,57 +2,54 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from app.states.game_sassion import SessionCreation
-from app.services.database import create_session, join_session
+from app.services.database import create_session, join_session, session_starts_at, JOIN_JOINED
+from app.services.scheduler import reminder_scheduler
 from app.utils.validators import is_valid_time
 from app.utils.message_cleaner import message_cleaner
 from app.keyboards.menu import get_main_menu_keyboard, get_cancel_keyboard
 from app.utils.logger import session_logger
-from aiogram_calendar import SimpleCalendar, SimpleCalendarCallback
+from aiogram_calendar import SimpleCalendarCallback
 from app.keyboards.time_picker import get_time_picker_keyboard
-from app.utils import check_user_not_blocked
-from app.utils.calendar import CustomSimpleCalendar
+from app.utils.calendar import session_calendar
 
 router = Router()
 
 
 @router.callback_query(F.data.startswith("game_"))
-@check_user_not_blocked
 async def process_game_selection(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     game = callback.data.split("_")[1]
-    session_logger.info(f"User {user_id} selected game: {game}")
+    session_logger.info("User %s selected game: %s", user_id, game)
     await message_cleaner.delete_previous_messages(callback.bot, user_id)
     if game == "other":
         response = await callback.message.answer("Введите название игры:", reply_markup=get_cancel_keyboard())
         await message_cleaner.add_message_to_delete(user_id, response)
         await state.set_state(SessionCreation.choosing_game)
-        session_logger.info(f"User {user_id} prompted to enter custom game name")
+        session_logger.info("User %s prompted to enter custom game name", user_id)
     else:
         await state.update_data(game=game)
         await state.set_state(SessionCreation.setting_date)
         await show_calendar(callback.message, state)
-        session_logger.info(f"User {user_id} prompted to enter date for game {game}")
+        session_logger.info("User %s prompted to enter date for game %s", user_id, game)
 
 
 @router.message(SessionCreation.choosing_game)
-@check_user_not_blocked
 async def process_custom_game(message: Message, state: FSMContext):
     user_id = message.from_user.id
     game_name = message.text
-    session_logger.info(f"User {user_id} entered custom game name: {game_name}")
+    session_logger.info("User %s entered custom game name: %s", user_id, game_name)
     await message_cleaner.add_user_message(message)
     await state.update_data(game=game_name)
     await state.set_state(SessionCreation.setting_date)
     await message_cleaner.delete_previous_messages(message.bot, user_id)
     await show_calendar(message, state)
-    session_logger.info(f"User {user_id} prompted to enter date for custom game {game_name}")
+    session_logger.info("User %s prompted to enter date for custom game %s", user_id, game_name)
 
 
 async def show_calendar(message: Message, state: FSMContext):
-    calendar = CustomSimpleCalendar()
     response = await message.answer(
         "Выберите дату проведения игры:",
-        reply_markup=await calendar.start_calendar()
+        reply_markup=await session_calendar.start_calendar()
     )
 
     await message_cleaner.add_message_to_delete(message.from_user.id, response)
@@ -60,10 +57,8 @@ async def show_calendar(message: Message, state: FSMContext):
 
 
 @router.callback_query(SimpleCalendarCallback.filter())
-@check_user_not_blocked
 async def process_calendar(callback: CallbackQuery, callback_data: SimpleCalendarCallback, state: FSMContext):
-    calendar = SimpleCalendar()
-    selected, date = await calendar.process_selection(callback, callback_data)
+    selected, date = await session_calendar.process_selection(callback, callback_data)
     if selected:
         user_id = callback.from_user.id
         await state.update_data(date=date.strftime("%Y-%m-%d"))
@@ -82,7 +77,6 @@ async def process_calendar(callback: CallbackQuery, callback_data: SimpleCalenda
 
 
 @router.callback_query(F.data.startswith("time_"))
-@check_user_not_blocked
 async def process_time_selection(callback: CallbackQuery, state: FSMContext):
     if callback.data == "cancel_session_creation":
         await cancel_session_creation(callback, state)
@@ -111,11 +105,10 @@ async def process_time_selection(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(SessionCreation.setting_custom_time)
-@check_user_not_blocked
 async def process_custom_time(message: Message, state: FSMContext):
     user_id = message.from_user.id
     time_input = message.text
-    session_logger.info(f"User {user_id} entered custom time: {time_input}")
+    session_logger.info("User %s entered custom time: %s", user_id, time_input)
     await message_cleaner.add_user_message(message)
 
     if is_valid_time(time_input):
@@ -131,16 +124,16 @@ async def process_custom_time(message: Message, state: FSMContext):
 
 
 @router.message(SessionCreation.setting_max_players)
-@check_user_not_blocked
 async def process_max_players(message: Message, state: FSMContext):
     user_id = message.from_user.id
     max_players_input = message.text
-    session_logger.info(f"User {user_id} entered max players: {max_players_input}")
+    session_logger.info("User %s entered max players: %s", user_id, max_players_input)
     await message_cleaner.add_user_message(message)
 
-    if not max_players_input.isdigit():
-        session_logger.warning(f"User {user_id} entered invalid max players: {max_players_input}")
-        response = await message.answer("Пожалуйста, введите число.", reply_markup=get_cancel_keyboard())
+    # Создатель сразу занимает одно место, поэтому мест должно быть хотя бы одно
+    if not (max_players_input.isascii() and max_players_input.isdigit()) or int(max_players_input) < 1:
+        session_logger.warning("User %s entered invalid max players: %s", user_id, max_players_input)
+        response = await message.answer("Пожалуйста, введите число больше нуля.", reply_markup=get_cancel_keyboard())
         await message_cleaner.add_message_to_delete(user_id, response)
         return
 
@@ -149,10 +142,16 @@ async def process_max_players(message: Message, state: FSMContext):
     session_id = await create_session(user_data['game'], user_data['date'], user_data['time'], max_players, user_id)
     await state.clear()
 
-    await join_session(session_id, user_id)
+    join_status, _ = await join_session(session_id, user_id)
+    reminder_scheduler.schedule(session_id, session_starts_at(user_data['date'], user_data['time']))
 
     await message_cleaner.delete_previous_messages(message.bot, user_id)
 
+    if join_status == JOIN_JOINED:
+        join_note = "Вы автоматически присоединены к этой сессии."
+    else:
+        session_logger.warning("Creator %s was not joined to session %s: %s", user_id, session_id, join_status)
+        join_note = "Не удалось автоматически присоединить вас к этой сессии."
     success_message = (
         f"✅ Сессия успешно создана!\n\n"
         f"🎴 ID сессии: {session_id}\n"
@@ -160,7 +159,7 @@ async def process_max_players(message: Message, state: FSMContext):
         f"📅 Дата: {user_data['date']}\n"
         f"🕒 Время: {user_data['time']}\n"
         f"👥 Максимум игроков: {max_players}\n\n"
-        f"Вы автоматически присоединены к этой сессии."
+        f"{join_note}"
     )
 
     response = await message.answer(
@@ -169,11 +168,10 @@ async def process_max_players(message: Message, state: FSMContext):
     )
 
     await message_cleaner.add_message_to_delete(user_id, response)
-    session_logger.info(f"User {user_id} successfully created session {session_id} for game {user_data['game']}")
+    session_logger.info("User %s successfully created session %s for game %s", user_id, session_id, user_data['game'])
 
 
 @router.callback_query(F.data == "cancel_session_creation")
-@check_user_not_blocked
 async def cancel_session_creation(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
 
@@ -186,7 +184,7 @@ async def cancel_session_creation(callback: CallbackQuery, state: FSMContext):
         try:
             await callback.bot.delete_message(user_id, calendar_message_id)
         except Exception as e:
-            session_logger.error(f"Failed to delete calendar message: {e}")
+            session_logger.error("Failed to delete calendar message: %s", e)
 
     # Удаляем все остальные сообщения
     await message_cleaner.delete_previous_messages(callback.bot, user_id)
@@ -204,4 +202,4 @@ async def cancel_session_creation(callback: CallbackQuery, state: FSMContext):
     # Отвечаем на callback, чтобы убрать "часики" на кнопке
     await callback.answer()
 
-    session_logger.info(f"User {user_id} cancelled session creation and returned to main menu")
\ No newline at end of file
+    session_logger.info("User %s cancelled session creation and returned to main menu", user_id)
\ No newline at end of file
@@ -2,11 +2,13 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from app.keyboards.registry import keyboards
 from app.utils.logger import help_logger
 
 router = Router()
 
 
+@keyboards.register("back_menu")
 def get_back_menu_keyboard():
     help_logger.debug("Creating back to menu keyboard")
     builder = InlineKeyboardBuilder()
@@ -17,7 +19,7 @@ def get_back_menu_keyboard():
 @router.message(Command("help"))
 async def cmd_help(message: Message):
     user_id = message.from_user.id
-    help_logger.info(f"User {user_id} requested help command")
+    help_logger.info("User %s requested help command", user_id)
 
     help_text = (
         "В случае ошибок или пожеланий прошу писать @flyerts\n\n"
@@ -25,7 +27,7 @@ async def cmd_help(message: Message):
     )
 
     await message.answer(help_text, reply_markup=get_back_menu_keyboard())
-    help_logger.info(f"Help information sent to user {user_id}")
+    help_logger.info("Help information sent to user %s", user_id)
 
 # @router.message(F.text)
 # async def handle_unknown_message(message: Message):
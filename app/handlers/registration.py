@@ -15,13 +15,13 @@ router = Router()
 async def process_name(message: Message, state: FSMContext):
     user_id = message.from_user.id
     name = message.text
-    registration_logger.info(f"User {user_id} attempting to register with name: {name}")
+    registration_logger.info("User %s attempting to register with name: %s", user_id, name)
 
     await message_cleaner.delete_previous_messages(message.bot, user_id)
     await message_cleaner.add_user_message(message)
 
     if not is_valid_russian_name(name):
-        registration_logger.warning(f"Invalid name entered by user {user_id}: {name}")
+        registration_logger.warning("Invalid name entered by user %s: %s", user_id, name)
         response = await message.answer("Пожалуйста, введите корректное имя на русском языке.")
         await message_cleaner.add_message_to_delete(user_id, response)
         return
@@ -30,18 +30,18 @@ async def process_name(message: Message, state: FSMContext):
     response = await message.answer("Отлично! Теперь введите ваш возраст:")
     await message_cleaner.add_message_to_delete(user_id, response)
     await state.set_state(RegistrationStates.waiting_for_age)
-    registration_logger.info(f"Name accepted for user {user_id}. Waiting for age input.")
+    registration_logger.info("Name accepted for user %s. Waiting for age input.", user_id)
 
 @router.message(RegistrationStates.waiting_for_age)
 async def process_age(message: Message, state: FSMContext):
     user_id = message.from_user.id
     age = message.text
-    registration_logger.info(f"User {user_id} entered age: {age}")
+    registration_logger.info("User %s entered age: %s", user_id, age)
 
     await message_cleaner.add_user_message(message)
 
     if not is_valid_age(age):
-        registration_logger.warning(f"Invalid age entered by user {user_id}: {age}")
+        registration_logger.warning("Invalid age entered by user %s: %s", user_id, age)
         response = await message.answer("Пожалуйста, введите корректный возраст (только цифры).")
         await message_cleaner.add_message_to_delete(user_id, response)
         return
@@ -54,7 +54,7 @@ async def process_age(message: Message, state: FSMContext):
 
     try:
         await save_user(user_data['name'], age, user_data['username'], user_data['user_id'])
-        registration_logger.info(f"User {user_id} successfully registered. Name: {user_data['name']}, Age: {age}")
+        registration_logger.info("User %s successfully registered. Name: %s, Age: %s", user_id, user_data['name'], age)
 
         response = await message.answer(
             f"Регистрация завершена!\n"
@@ -66,7 +66,7 @@ async def process_age(message: Message, state: FSMContext):
         )
         await message_cleaner.add_message_to_delete(user_id, response)
     except Exception as e:
-        registration_logger.error(f"Error saving user {user_id} to database: {str(e)}", exc_info=True)
+        registration_logger.error("Error saving user %s to database: %s", user_id, e, exc_info=True)
         response = await message.answer(
             "Произошла ошибка при регистрации. Пожалуйста, попробуйте еще раз или обратитесь к администратору.")
         await message_cleaner.add_message_to_delete(user_id, response)
\ No newline at end of file
@@ -1,6 +1,9 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.keyboards.registry import keyboards
 
+
+@keyboards.register("get_user_management_keyboard")
 def get_user_management_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="👥 Список", callback_data="list_users")
@@ -13,9 +16,30 @@ def get_user_management_keyboard():
     return builder.as_markup()
 
 
+@keyboards.register("get_user_statistics_keyboard")
 def get_user_statistics_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="🔄 Обновить статистику", callback_data="refresh_statistics")
     builder.button(text="⬅️ Назад к управлению", callback_data="manage_users")
     builder.adjust(1)
     return builder.as_markup()
+
+
+def get_users_list_keyboard(users, has_prev: bool = False, has_next: bool = False, has_query: bool = False):
+    builder = InlineKeyboardBuilder()
+    sizes = []
+    # Кнопки листания несут ID крайнего пользователя страницы
+    if has_prev:
+        builder.button(text="⬅️ Назад", callback_data=f"users_prev_{users[0]['id']}")
+    if has_next:
+        builder.button(text="Вперед ➡️", callback_data=f"users_next_{users[-1]['id']}")
+    if has_prev or has_next:
+        sizes.append(int(has_prev) + int(has_next))
+    builder.button(text="🔍 Поиск", callback_data="users_search")
+    if has_query:
+        builder.button(text="✖️ Сбросить поиск", callback_data="users_search_reset")
+    sizes.append(2 if has_query else 1)
+    builder.button(text="📄 Выгрузить в CSV", callback_data="users_export")
+    builder.button(text="⬅️ Назад к управлению", callback_data="manage_users")
+    builder.adjust(*sizes, 1)
+    return builder.as_markup()
@@ -1,8 +1,13 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from app.config_reader import config
+from app.keyboards.registry import keyboards
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 def get_main_menu_keyboard(user_id: int):
+    return _main_menu_keyboard(user_id == config.admin_user_id)
+
+@keyboards.register("main_menu")
+def _main_menu_keyboard(is_admin: bool):
     builder = InlineKeyboardBuilder()
     builder.button(text="🎮 Выбрать игру", callback_data="choose_game")
     builder.button(text="📋 Список сессий", callback_data="list_sessions")
@@ -11,17 +16,22 @@ def get_main_menu_keyboard(user_id: int):
     builder.button(text="❓ Помощь", callback_data="help")
 
     # Добавляем кнопку управления пользователями для админа
-    if user_id == config.admin_user_id:
+    if is_admin:
         builder.button(text="⚙️ Управление", callback_data="manage_users")
 
     builder.adjust(2)  # Размещаем кнопки в два столбца
     return builder.as_markup()
 
 def back_to_main_menu_keyboard(user_id: int):
+    return _back_to_main_menu_keyboard()
+
+@keyboards.register("back_to_main_menu")
+def _back_to_main_menu_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="🔙 Назад", callback_data="back_to_menu")
     return builder.as_markup()
 
+@keyboards.register("choose_game_keyboard")
 def choose_game_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="🦆 GGDuck", callback_data="game_GouseGouseDuck")
@@ -31,6 +41,7 @@ def choose_game_keyboard():
     return builder.as_markup()
 
 
+@keyboards.register("show_profile_keyboard")
 def show_profile_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="Изменить профиль", callback_data="edit_profile")
@@ -42,7 +53,7 @@ def get_my_sessions_keyboard(user_sessions):
     builder = InlineKeyboardBuilder()
 
     for session in user_sessions:
-        builder.button(text=f"Сессия {session['id']}", callback_data=f"session_info_{session['id']}")
+        builder.button(text=f"Сессия {session.id}", callback_data=f"session_info_{session.id}")
 
     builder.button(text="История", callback_data="session_history")
     builder.button(text="Назад в меню", callback_data="back_to_menu")
@@ -51,6 +62,7 @@ def get_my_sessions_keyboard(user_sessions):
     return builder.as_markup()
 
 
+@keyboards.register("get_manage_users_keyboard")
 def get_manage_users_keyboard():
     builder = InlineKeyboardBuilder()
     builder.button(text="👥 Список", callback_data="list_users")
@@ -61,6 +73,7 @@ def get_manage_users_keyboard():
     return builder.as_markup()
 
 
+@keyboards.register("get_cancel_keyboard")
 def get_cancel_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Отменить и вернуться в главное меню", callback_data="cancel_session_creation")]
@@ -0,0 +1,64 @@
+import functools
+import inspect
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+
+# Реестр готовых клавиатур. Построитель вызывается один раз на набор аргументов,
+# дальше все обработчики получают один и тот же объект разметки.
+# Разметка общая, поэтому ее нельзя менять на месте - только model_copy
+class KeyboardRegistry:
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._markups: "OrderedDict[Tuple[str, Hashable], InlineKeyboardMarkup]" = OrderedDict()
+
+    def _get(self, key) -> Any:
+        markup = self._markups.get(key)
+        if markup is None:
+            self.misses += 1
+            return None
+        self._markups.move_to_end(key)
+        self.hits += 1
+        return markup
+
+    def _set(self, key, markup: InlineKeyboardMarkup):
+        self._markups[key] = markup
+        while len(self._markups) > self.max_size:
+            self._markups.popitem(last=False)
+
+    def register(self, name: str) -> Callable:
+        def decorator(builder: Callable) -> Callable:
+            if inspect.iscoroutinefunction(builder):
+                @functools.wraps(builder)
+                async def async_wrapper(*args):
+                    key = (name, args)
+                    markup = self._get(key)
+                    if markup is None:
+                        markup = await builder(*args)
+                        self._set(key, markup)
+                    return markup
+                return async_wrapper
+
+            @functools.wraps(builder)
+            def wrapper(*args):
+                key = (name, args)
+                markup = self._get(key)
+                if markup is None:
+                    markup = builder(*args)
+                    self._set(key, markup)
+                return markup
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self._markups.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._markups), "hits": self.hits, "misses": self.misses}
+
+
+keyboards = KeyboardRegistry()
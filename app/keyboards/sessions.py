@@ -1,12 +1,80 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.keyboards.registry import keyboards
 
-def get_sessions_list_keyboard(sessions):
+
+def get_sessions_list_keyboard(sessions, has_prev: bool = False, has_next: bool = False):
     builder = InlineKeyboardBuilder()
     for session in sessions:
-        session_id = session[0]
+        session_id = session['id']
         builder.button(text=f"Подробнее о сессии {session_id}", callback_data=f"session_info_{session_id}")
 
+    # Кнопки листания несут позицию крайней сессии страницы: (starts_at, id)
+    navigation = 0
+    if has_prev:
+        first = sessions[0]
+        builder.button(text="⬅️ Назад", callback_data=f"sessions_prev_{first['starts_at']}_{first['id']}")
+        navigation += 1
+    if has_next:
+        last = sessions[-1]
+        builder.button(text="Вперед ➡️", callback_data=f"sessions_next_{last['starts_at']}_{last['id']}")
+        navigation += 1
+
     builder.button(text="Назад в меню", callback_data="back_to_menu")
-    builder.adjust(1)  # Размещаем кнопки в один столбец
-    return builder.as_markup()
\ No newline at end of file
+    # Сессии в один столбец, кнопки листания в одну строку
+    sizes = [1] * len(sessions)
+    if navigation:
+        sizes.append(navigation)
+    builder.adjust(*sizes, 1)
+    return builder.as_markup()
+
+
+# Вариантов клавиатуры карточки три: создатель, участник и все остальные
+@keyboards.register("session_card")
+def get_session_card_keyboard(session_id: int, is_creator: bool, is_participant: bool):
+    builder = InlineKeyboardBuilder()
+    if is_creator:
+        builder.button(text="Удалить сессию", callback_data=f"delete_session_{session_id}")
+    elif is_participant:
+        builder.button(text="Выйти из сессии", callback_data=f"leave_{session_id}")
+    else:
+        builder.button(text="Присоединиться", callback_data=f"join_{session_id}")
+
+    if is_participant:
+        builder.button(text="История сессии", callback_data=f"history_session_{session_id}")
+    builder.button(text="Назад к списку", callback_data="list_sessions")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+# История показывает только сессии, в которых пользователь участвует сейчас,
+# поэтому события удаления сессий (вместе с ее участниками) в нее не попадают
+HISTORY_EVENT_FILTERS = {
+    "confirmed": "Подтверждения",
+    "declined": "Отказы",
+}
+
+
+def get_history_keyboard(events, has_newer: bool = False, has_older: bool = False,
+                         session_id: int = None, event_type: str = None):
+    builder = InlineKeyboardBuilder()
+    sizes = []
+    # Кнопки листания несут позицию крайнего события страницы: (timestamp, id)
+    if has_newer:
+        builder.button(text="⬅️ Новее", callback_data=f"history_newer_{events[0]['ts']}_{events[0]['id']}")
+    if has_older:
+        builder.button(text="Старше ➡️", callback_data=f"history_older_{events[-1]['ts']}_{events[-1]['id']}")
+    if has_newer or has_older:
+        sizes.append(int(has_newer) + int(has_older))
+
+    builder.button(text=f"{'✅ ' if event_type is None else ''}Все", callback_data="history_type_all")
+    for value, text in HISTORY_EVENT_FILTERS.items():
+        builder.button(text=f"{'✅ ' if event_type == value else ''}{text}", callback_data=f"history_type_{value}")
+    sizes.append(1 + len(HISTORY_EVENT_FILTERS))
+    if session_id is not None:
+        builder.button(text="✖️ Все сессии", callback_data="history_session_all")
+        sizes.append(1)
+
+    builder.button(text="Назад к моим сессиям", callback_data="my_sessions")
+    builder.adjust(*sizes, 1)
+    return builder.as_markup()
@@ -1,31 +1,71 @@
 import asyncio
-import logging
 from aiogram import Bot, Dispatcher
 from config_reader import config
 from aiogram.client.bot import DefaultBotProperties
 from aiogram.enums import ParseMode
-from services.database import init_db
+from aiohttp import web
+from services.database import init_db, load_blocked_users_cache, DATABASE_PATH
+from app.services.db_pool import db_pool
+from app.services.fsm_storage import fsm_storage
 from handlers import register_handlers
 from callbacks import register_callback
-from services.notifications import send_session_reminders
+from app.middlewares import register_middlewares, CallbackAnswerRecorder
+from app.services.scheduler import reminder_scheduler
+from app.services.delivery import delivery_queue
+from app.services.metrics import BotRequestMetrics, metrics_server
+from app.services.retention import retention_job
 from app.utils.logger import main_logger
+from app.utils.message_cleaner import message_cleaner
+from app.webhook import create_app, webhook_secret
 
 
-async def scheduled_reminders(bot: Bot):
-    while True:
-        await send_session_reminders(bot)
-        await asyncio.sleep(600)  # Проверяем каждые 10 минут
+async def run_polling(bot: Bot, dp: Dispatcher, allowed_updates):
+    # Способ для пропуска старых апдейтов
+    await bot.delete_webhook(drop_pending_updates=True)
+    main_logger.info("Starting polling")
+    await dp.start_polling(bot, allowed_updates=allowed_updates)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, allowed_updates):
+    if not config.webhook_base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL must be set to run in webhook mode")
+    secret = webhook_secret(config.webhook_secret.get_secret_value() if config.webhook_secret else None)
+    app = create_app(dp, bot, path=config.webhook_path, secret_token=secret, workers=config.webhook_workers)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.webhook_host, config.webhook_port)
+    await site.start()
+    main_logger.info("Webhook server listening on %s:%s%s",
+                     config.webhook_host, config.webhook_port, config.webhook_path)
+
+    await bot.set_webhook(f"{config.webhook_base_url.rstrip('/')}{config.webhook_path}", secret_token=secret,
+                          allowed_updates=allowed_updates, drop_pending_updates=True)
+    try:
+        # Работаем до остановки процесса
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def main():
     main_logger.info("Starting the bot")
-    logging.basicConfig(level=logging.INFO)
 
     await init_db()
+    await db_pool.start(DATABASE_PATH)
+    await load_blocked_users_cache()
+    await message_cleaner.start()
 
     bot = Bot(token=config.bot_token.get_secret_value(), default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    bot.session.middleware(BotRequestMetrics())
+    # Запоминает ответы на нажатия кнопок для повторных нажатий
+    bot.session.middleware(CallbackAnswerRecorder())
+
+    # Состояния FSM хранятся в базе и переживают перезапуск
+    fsm_storage.start()
+    dp = Dispatcher(storage=fsm_storage)
 
-    dp = Dispatcher()
+    # Проверка статуса пользователя до роутинга
+    register_middlewares(dp)
 
     # Регистрация обработчиков
     register_handlers(dp)
@@ -34,18 +74,27 @@ async def main():
     # Установка разрешенных обновлений
     allowed_updates = ["message", "callback_query"]
 
-    asyncio.create_task(scheduled_reminders(bot))
-
-    # Способ для пропуска старых апдейтов
-    await bot.delete_webhook(drop_pending_updates=True)
+    await reminder_scheduler.start(bot)
+    delivery_queue.start(bot)
+    retention_job.start()
+    if config.metrics_enabled:
+        await metrics_server.start()
 
     try:
-        # Обработка pooling
-        main_logger.info("Starting polling")
-        await dp.start_polling(bot, allowed_updates=allowed_updates)
+        if config.bot_mode == 'webhook':
+            await run_webhook(bot, dp, allowed_updates)
+        else:
+            await run_polling(bot, dp, allowed_updates)
     except Exception as e:
-        main_logger.error(f"An error occurred: {e}", exc_info=True)
+        main_logger.error("An error occurred: %s", e, exc_info=True)
     finally:
+        await metrics_server.close()
+        await retention_job.close()
+        await reminder_scheduler.close()
+        await delivery_queue.close()
+        await fsm_storage.close()
+        await message_cleaner.close()
+        await db_pool.close()
         main_logger.info("Bot stopped")
 
 
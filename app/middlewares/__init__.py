@@ -0,0 +1,24 @@
+from aiogram import Dispatcher
+
+from app.config_reader import config
+
+from .coalescing import CallbackCoalescingMiddleware, CallbackAnswerRecorder
+from .metrics import HandlerMetricsMiddleware
+from .query_profiler import QueryProfilerMiddleware
+from .update_context import UpdateContextMiddleware
+from .user_status import UserStatusMiddleware
+
+
+def register_middlewares(dp: Dispatcher):
+    dp.update.outer_middleware(UpdateContextMiddleware())
+    if config.db_profile:
+        dp.update.outer_middleware(QueryProfilerMiddleware(config.db_profile_slow_ms))
+    # Дубликаты нажатий отсекаются раньше проверки статуса пользователя и обработчиков
+    dp.callback_query.outer_middleware(CallbackCoalescingMiddleware(
+        window=config.callback_debounce_window, wait_timeout=config.callback_coalesce_timeout))
+    user_status_middleware = UserStatusMiddleware()
+    dp.message.outer_middleware(user_status_middleware)
+    dp.callback_query.outer_middleware(user_status_middleware)
+    handler_metrics_middleware = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_metrics_middleware)
+    dp.callback_query.middleware(handler_metrics_middleware)
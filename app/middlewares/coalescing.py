@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import AnswerCallbackQuery, TelegramMethod
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.middlewares.metrics import callback_prefix
+from app.services.metrics import callback_duplicates
+from app.utils.logger import middleware_logger
+
+
+class _PressResult:
+    __slots__ = ('callback_query_id', 'data', 'done', 'finished_at', 'answer')
+
+    def __init__(self, callback_query_id: str, data: Optional[str], loop: asyncio.AbstractEventLoop):
+        self.callback_query_id = callback_query_id
+        self.data = data
+        self.done = loop.create_future()
+        self.finished_at: Optional[float] = None
+        # Параметры answerCallbackQuery, которыми обработчик ответил на первое нажатие
+        self.answer: Optional[Dict[str, Any]] = None
+
+
+# Нажатие, которое сейчас обрабатывается в этой задаче: сюда записывается его ответ
+current_press: ContextVar[Optional[_PressResult]] = ContextVar('current_press', default=None)
+
+
+# Middleware сессии бота: запоминает ответ обработчика на нажатие кнопки,
+# чтобы повторить его на повторные нажатия
+class CallbackAnswerRecorder(BaseRequestMiddleware):
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        press = current_press.get()
+        if press is not None and isinstance(method, AnswerCallbackQuery) \
+                and method.callback_query_id == press.callback_query_id:
+            press.answer = {"text": method.text, "show_alert": method.show_alert}
+        return await make_request(bot, method)
+
+
+# Повторные нажатия одной и той же кнопки одного сообщения одним пользователем не доходят
+# до обработчиков: пока первое нажатие обрабатывается и еще window секунд после этого
+# дубликат получает тот же ответ, что и первое нажатие. Хранится только последнее нажатие
+# на сообщении, поэтому нажатие другой кнопки сбрасывает окно (join -> leave -> join)
+class CallbackCoalescingMiddleware(BaseMiddleware):
+    def __init__(self, window: float = 1, wait_timeout: float = 10):
+        self.window = window
+        self.wait_timeout = wait_timeout
+        self._presses: "OrderedDict[Tuple, _PressResult]" = OrderedDict()
+
+    @staticmethod
+    def _key(event: CallbackQuery) -> Tuple:
+        if event.message is not None:
+            message = (event.message.chat.id, event.message.message_id)
+        else:
+            message = (None, event.inline_message_id)
+        return event.from_user.id, message
+
+    def _forget_finished(self, now: float):
+        # Нажатия хранятся в порядке поступления; убираем устаревшие с начала
+        while self._presses:
+            press = next(iter(self._presses.values()))
+            if press.finished_at is None or now - press.finished_at < self.window:
+                break
+            self._presses.popitem(last=False)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        now = time.monotonic()
+        self._forget_finished(now)
+        key = self._key(event)
+        press = self._presses.get(key)
+        if press is not None and press.data == event.data \
+                and (press.finished_at is None or now - press.finished_at < self.window):
+            await self._answer_duplicate(event, press)
+            return None
+
+        press = _PressResult(event.id, event.data, asyncio.get_running_loop())
+        self._presses.pop(key, None)
+        self._presses[key] = press
+        token = current_press.set(press)
+        try:
+            return await handler(event, data)
+        finally:
+            current_press.reset(token)
+            press.finished_at = time.monotonic()
+            press.done.set_result(None)
+
+    async def _answer_duplicate(self, event: CallbackQuery, press: _PressResult):
+        kind = "debounced" if press.done.done() else "in_flight"
+        callback_duplicates.inc(callback_prefix(event), kind)
+        middleware_logger.info("Duplicate press of %s by user %s (%s)", event.data, event.from_user.id, kind)
+        if not press.done.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(press.done), self.wait_timeout)
+            except asyncio.TimeoutError:
+                pass
+        try:
+            await event.answer(**(press.answer or {}))
+        except Exception as e:
+            middleware_logger.warning("Error answering duplicate press of %s: %s", event.data, e)
@@ -0,0 +1,42 @@
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.services.metrics import handler_duration, handler_errors
+
+# Постоянная часть данных кнопки: join_12 -> join_, time_18:00 -> time_,
+# simple_calendar:DAY:2025:6:15 -> simple_calendar
+CALLBACK_PREFIX = re.compile(r'[^\d:]*')
+
+
+def callback_prefix(event: TelegramObject) -> str:
+    if isinstance(event, CallbackQuery) and event.data:
+        return CALLBACK_PREFIX.match(event.data).group()
+    return ''
+
+
+# Замеряет время каждого обработчика. Метки: модуль роутера, имя обработчика
+# и префикс данных кнопки. Внутренние middleware диспетчера срабатывают
+# и для обработчиков всех вложенных роутеров
+class HandlerMetricsMiddleware(BaseMiddleware):
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = handler_object.callback if handler_object is not None else handler
+        router = callback.__module__.removeprefix('app.')
+        labels = (router, callback.__name__, callback_prefix(event))
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(*labels, type(e).__name__)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started, *labels)
@@ -0,0 +1,27 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.services.db_profiler import UpdateProfile, current_profile
+
+
+# Режим отладки: собирает все SQL-запросы обновления и после обработки пишет отчет
+# с повторяющимися и медленными запросами
+class QueryProfilerMiddleware(BaseMiddleware):
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        profile = UpdateProfile(event.update_id)
+        token = current_profile.set(profile)
+        try:
+            return await handler(event, data)
+        finally:
+            current_profile.reset(token)
+            profile.log_report(self.slow_ms)
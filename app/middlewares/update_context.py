@@ -0,0 +1,26 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.utils.logger import current_update_id, update_started_at, update_logger
+
+
+# Отмечает в контексте id обновления и время начала обработки: их получает каждая
+# запись лога, сделанная при обработке. В конце пишет одну строку с временем обработки
+class UpdateContextMiddleware(BaseMiddleware):
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        update_token = current_update_id.set(event.update_id)
+        started_token = update_started_at.set(time.perf_counter())
+        try:
+            return await handler(event, data)
+        finally:
+            update_logger.info("Update %s (%s) handled", event.update_id, event.event_type)
+            update_started_at.reset(started_token)
+            current_update_id.reset(update_token)
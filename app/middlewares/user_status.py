@@ -0,0 +1,35 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject, User
+
+from app.services.database import is_user_blocked, is_user_registered
+from app.utils.logger import middleware_logger
+
+BLOCKED_USER_TEXT = "Вы заблокированы и не можете использовать бота."
+
+
+# Один раз на апдейт определяет статус пользователя и кладет его в данные хендлера
+# (is_registered, is_blocked). Заблокированные пользователи отсекаются до роутинга
+class UserStatusMiddleware(BaseMiddleware):
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user: User = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        if await is_user_blocked(user.id):
+            middleware_logger.warning("Blocked user %s rejected before routing", user.id)
+            if isinstance(event, Message):
+                await event.answer(BLOCKED_USER_TEXT)
+            elif isinstance(event, CallbackQuery):
+                await event.answer(BLOCKED_USER_TEXT, show_alert=True)
+            return None
+
+        data["is_blocked"] = False
+        data["is_registered"] = await is_user_registered(user.id)
+        return await handler(event, data)
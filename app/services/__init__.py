@@ -1,2 +1 @@
 from . import database
-from . import notifications
\ No newline at end of file
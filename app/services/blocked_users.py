@@ -0,0 +1,53 @@
+from typing import Dict, Iterable, Optional, Set
+
+from app.services.metrics import blocked_users_lookups, blocked_users_reloads, blocked_users_size
+
+
+# Множество ID заблокированных пользователей в памяти процесса.
+# Загружается один раз при старте и обновляется функциями block_user/unblock_user
+class BlockedUsersCache:
+    def __init__(self):
+        self._blocked_ids: Set[int] = set()
+        self.is_loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def load(self, user_ids: Iterable[int]):
+        self._blocked_ids = set(user_ids)
+        self.is_loaded = True
+        self.reloads += 1
+        blocked_users_reloads.inc()
+        blocked_users_size.set(len(self._blocked_ids))
+
+    def lookup(self, user_id: int) -> Optional[bool]:
+        # None - множество еще не загружено и ответ нужно взять из базы
+        if not self.is_loaded:
+            self.misses += 1
+            blocked_users_lookups.inc('miss')
+            return None
+        self.hits += 1
+        blocked_users_lookups.inc('hit')
+        return user_id in self._blocked_ids
+
+    def is_blocked(self, user_id: int) -> bool:
+        return user_id in self._blocked_ids
+
+    def add(self, user_id: int):
+        self._blocked_ids.add(user_id)
+        blocked_users_size.set(len(self._blocked_ids))
+
+    def discard(self, user_id: int):
+        self._blocked_ids.discard(user_id)
+        blocked_users_size.set(len(self._blocked_ids))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "blocked_users": len(self._blocked_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+
+blocked_users_cache = BlockedUsersCache()
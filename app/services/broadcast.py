@@ -0,0 +1,136 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError,
+                                TelegramRetryAfter, TelegramServerError)
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from app.config_reader import config
+from app.utils.logger import notification_logger
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Сколько секунд ждать до появления токена (0 - токен взят)
+    def try_acquire(self) -> float:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def is_idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+# Лимиты Telegram: общий на бота и отдельный на каждый чат
+class RateLimiter:
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int = 1, max_idle_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_idle_chats = max_idle_chats
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_idle_chats:
+                self._chat_buckets = {key: value for key, value in self._chat_buckets.items() if not value.is_idle}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def wait(self, chat_id: Optional[int] = None):
+        if chat_id is not None:
+            bucket = self._chat_bucket(chat_id)
+            while (delay := bucket.try_acquire()) > 0:
+                await asyncio.sleep(delay)
+        while (delay := self.global_bucket.try_acquire()) > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class OutgoingMessage:
+    chat_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+@dataclass
+class BroadcastResult:
+    delivered: int = 0
+    failed: int = 0
+    sent_messages: List[Message] = field(default_factory=list)
+
+
+class Broadcaster:
+    def __init__(self, rate_limiter: RateLimiter, concurrency: int = 10, max_retries: int = 3):
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+
+    async def send(self, bot: Bot, messages: Iterable[OutgoingMessage]) -> BroadcastResult:
+        result = BroadcastResult()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(message: OutgoingMessage):
+            async with semaphore:
+                response = await self._deliver(bot, message)
+            if response is None:
+                result.failed += 1
+            else:
+                result.delivered += 1
+                result.sent_messages.append(response)
+
+        await asyncio.gather(*(deliver(message) for message in messages))
+        notification_logger.info("Broadcast finished. Delivered: %s, failed: %s", result.delivered, result.failed)
+        return result
+
+    async def _deliver(self, bot: Bot, message: OutgoingMessage) -> Optional[Message]:
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.wait(message.chat_id)
+            try:
+                return await bot.send_message(message.chat_id, message.text, reply_markup=message.reply_markup)
+            except TelegramRetryAfter as e:
+                notification_logger.warning("Flood control for chat %s, retry after %ss", message.chat_id, e.retry_after)
+                await asyncio.sleep(e.retry_after + attempt)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Пользователь заблокировал бота или чат недоступен - повторять бессмысленно
+                notification_logger.warning("Message to chat %s rejected: %s", message.chat_id, e)
+                return None
+            except (TelegramNetworkError, TelegramServerError) as e:
+                notification_logger.warning("Error sending message to chat %s: %s", message.chat_id, e)
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                notification_logger.error("Unexpected error sending message to chat %s: %s", message.chat_id, e,
+                                          exc_info=True)
+                return None
+        notification_logger.error("Giving up on message to chat %s after %s retries", message.chat_id, self.max_retries)
+        return None
+
+
+rate_limiter = RateLimiter(
+    global_rate=config.telegram_global_rate,
+    chat_rate=config.telegram_chat_rate,
+    chat_burst=config.telegram_chat_burst,
+)
+broadcaster = Broadcaster(
+    rate_limiter,
+    concurrency=config.broadcast_concurrency,
+    max_retries=config.broadcast_max_retries,
+)
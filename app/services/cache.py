@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config_reader import config
+
+
+# Ограниченный по размеру кэш с временем жизни записей.
+# version растет при каждой инвалидации: значение, прочитанное из базы до нее,
+# не попадет в кэш, даже если чтение закончилось позже записи
+class TTLCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        if version is not None and version != self.version:
+            return
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self.version += 1
+        self._items.pop(key, None)
+
+    def clear(self):
+        self.version += 1
+        self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+# Список активных сессий и карточки отдельных сессий
+session_list_cache = TTLCache(max_size=config.session_cache_size, ttl=config.session_cache_ttl)
+session_card_cache = TTLCache(max_size=config.session_cache_size, ttl=config.session_cache_ttl)
+
+
+def invalidate_session(session_id: Optional[int] = None):
+    session_list_cache.clear()
+    if session_id is None:
+        session_card_cache.clear()
+    else:
+        session_card_cache.pop(session_id)
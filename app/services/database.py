@@ -1,15 +1,187 @@
+import json
 import aiosqlite
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 from app.utils.logger import db_logger
+from app.services.db_pool import db_pool
+from app.services.blocked_users import blocked_users_cache
+from app.services.cache import session_list_cache, session_card_cache, invalidate_session
+from app.services.metrics import instrument_module
+from app.services.session_snapshot import SessionSnapshot
 
 DATABASE_PATH = 'data/TGB.sqlite'
 
+# Миграции схемы. Номер последней примененной миграции хранится в PRAGMA user_version,
+# каждая миграция выполняется в отдельной транзакции
+MIGRATIONS = [
+    # 1: время начала сессии в виде epoch и индексы для горячих запросов
+    [
+        "ALTER TABLE sessions ADD COLUMN starts_at INTEGER",
+        "UPDATE sessions SET starts_at = CAST(strftime('%s', date || ' ' || time, 'utc') AS INTEGER)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_starts_at ON sessions (starts_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_creator_id ON sessions (creator_id)",
+        "CREATE INDEX IF NOT EXISTS idx_participants_user_id ON participants (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_session_events_user ON user_session_events (user_id, event_type)",
+        "CREATE INDEX IF NOT EXISTS idx_user_session_events_session ON user_session_events (session_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_users_is_blocked ON users (is_blocked)",
+    ],
+    # 2: отправленные напоминания, чтобы не напоминать повторно
+    [
+        """CREATE TABLE IF NOT EXISTS sent_reminders
+           (session_id INTEGER, user_id INTEGER, sent_at INTEGER, PRIMARY KEY (session_id, user_id))""",
+    ],
+    # 3: состояния FSM
+    [
+        """CREATE TABLE IF NOT EXISTS fsm_states
+           (key TEXT PRIMARY KEY, state TEXT, data TEXT, updated_at INTEGER)""",
+        "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)",
+    ],
+    # 4: сообщения, которые бот удалит при следующем действии пользователя
+    [
+        """CREATE TABLE IF NOT EXISTS cleanup_messages
+           (user_id INTEGER, chat_id INTEGER, message_id INTEGER, created_at INTEGER,
+            PRIMARY KEY (user_id, chat_id, message_id))""",
+        "CREATE INDEX IF NOT EXISTS idx_cleanup_messages_created_at ON cleanup_messages (created_at)",
+    ],
+    # 5: поиск пользователей по началу имени
+    [
+        "CREATE INDEX IF NOT EXISTS idx_users_name ON users (name)",
+    ],
+    # 6: счетчики для статистики и дневная сводка. Их поддерживают триггеры в той же
+    # транзакции, что и сама запись. Для сессий и записей на игры дата создания не хранилась,
+    # поэтому дневная сводка по ним начинается с момента миграции.
+    # В триггерах нет INSERT OR IGNORE: политику конфликта переопределяет внешний запрос (upsert)
+    [
+        "CREATE TABLE IF NOT EXISTS stats_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)",
+        """CREATE TABLE IF NOT EXISTS stats_daily
+           (day TEXT PRIMARY KEY, sessions_created INTEGER NOT NULL DEFAULT 0, joins INTEGER NOT NULL DEFAULT 0,
+            confirmed INTEGER NOT NULL DEFAULT 0, declined INTEGER NOT NULL DEFAULT 0)""",
+        """INSERT OR REPLACE INTO stats_counters (name, value)
+           SELECT 'users_total', COUNT(*) FROM users
+           UNION ALL SELECT 'users_blocked', COUNT(*) FROM users WHERE is_blocked = 1
+           UNION ALL SELECT 'sessions_total', COUNT(*) FROM sessions
+           UNION ALL SELECT 'participations', COUNT(*) FROM participants
+           UNION ALL SELECT 'confirmed', COUNT(*) FROM session_confirmations WHERE status = 'confirmed'
+           UNION ALL SELECT 'declined', COUNT(*) FROM session_confirmations WHERE status = 'declined'""",
+        """INSERT OR REPLACE INTO stats_daily (day, confirmed, declined)
+           SELECT date(timestamp, 'localtime'),
+                  SUM(event_type = 'confirmed'), SUM(event_type = 'declined')
+           FROM user_session_events
+           WHERE event_type IN ('confirmed', 'declined')
+           GROUP BY date(timestamp, 'localtime')""",
+        """CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users BEGIN
+               UPDATE stats_counters SET value = value + 1 WHERE name = 'users_total';
+               UPDATE stats_counters SET value = value + 1 WHERE name = 'users_blocked' AND NEW.is_blocked = 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users BEGIN
+               UPDATE stats_counters SET value = value - 1 WHERE name = 'users_total';
+               UPDATE stats_counters SET value = value - 1 WHERE name = 'users_blocked' AND OLD.is_blocked = 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_users_block AFTER UPDATE OF is_blocked ON users
+           WHEN (coalesce(OLD.is_blocked, 0) = 1) != (coalesce(NEW.is_blocked, 0) = 1) BEGIN
+               UPDATE stats_counters SET value = value + (CASE WHEN NEW.is_blocked = 1 THEN 1 ELSE -1 END)
+               WHERE name = 'users_blocked';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_sessions_insert AFTER INSERT ON sessions BEGIN
+               UPDATE stats_counters SET value = value + 1 WHERE name = 'sessions_total';
+               INSERT INTO stats_daily (day) SELECT date('now', 'localtime')
+               WHERE NOT EXISTS (SELECT 1 FROM stats_daily WHERE day = date('now', 'localtime'));
+               UPDATE stats_daily SET sessions_created = sessions_created + 1 WHERE day = date('now', 'localtime');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_sessions_delete AFTER DELETE ON sessions BEGIN
+               UPDATE stats_counters SET value = value - 1 WHERE name = 'sessions_total';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_participants_insert AFTER INSERT ON participants BEGIN
+               UPDATE stats_counters SET value = value + 1 WHERE name = 'participations';
+               INSERT INTO stats_daily (day) SELECT date('now', 'localtime')
+               WHERE NOT EXISTS (SELECT 1 FROM stats_daily WHERE day = date('now', 'localtime'));
+               UPDATE stats_daily SET joins = joins + 1 WHERE day = date('now', 'localtime');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_participants_delete AFTER DELETE ON participants BEGIN
+               UPDATE stats_counters SET value = value - 1 WHERE name = 'participations';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_confirmations_insert AFTER INSERT ON session_confirmations
+           WHEN NEW.status IN ('confirmed', 'declined') BEGIN
+               UPDATE stats_counters SET value = value + 1 WHERE name = NEW.status;
+               INSERT INTO stats_daily (day) SELECT date('now', 'localtime')
+               WHERE NOT EXISTS (SELECT 1 FROM stats_daily WHERE day = date('now', 'localtime'));
+               UPDATE stats_daily SET confirmed = confirmed + (NEW.status = 'confirmed'),
+                                      declined = declined + (NEW.status = 'declined')
+               WHERE day = date('now', 'localtime');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_confirmations_update AFTER UPDATE OF status ON session_confirmations
+           WHEN OLD.status IS NOT NEW.status BEGIN
+               UPDATE stats_counters SET value = value - 1 WHERE name = OLD.status;
+               UPDATE stats_counters SET value = value + 1 WHERE name = NEW.status;
+               INSERT INTO stats_daily (day) SELECT date('now', 'localtime')
+               WHERE NOT EXISTS (SELECT 1 FROM stats_daily WHERE day = date('now', 'localtime'));
+               UPDATE stats_daily SET confirmed = confirmed + (NEW.status = 'confirmed'),
+                                      declined = declined + (NEW.status = 'declined')
+               WHERE day = date('now', 'localtime');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_confirmations_delete AFTER DELETE ON session_confirmations BEGIN
+               UPDATE stats_counters SET value = value - 1 WHERE name = OLD.status;
+           END""",
+    ],
+    # 7: архив завершившихся сессий. Строки переносятся сюда задачей очистки,
+    # чтобы рабочие таблицы оставались маленькими
+    [
+        """CREATE TABLE IF NOT EXISTS sessions_archive
+           (id INTEGER PRIMARY KEY, game TEXT, date TEXT, time TEXT, max_players INTEGER, creator_id INTEGER,
+            starts_at INTEGER, archived_at INTEGER)""",
+        """CREATE TABLE IF NOT EXISTS participants_archive
+           (session_id INTEGER, user_id INTEGER, PRIMARY KEY (session_id, user_id))""",
+        """CREATE TABLE IF NOT EXISTS session_confirmations_archive
+           (session_id INTEGER, user_id INTEGER, status TEXT, PRIMARY KEY (session_id, user_id))""",
+        """CREATE TABLE IF NOT EXISTS user_session_events_archive
+           (id INTEGER PRIMARY KEY, user_id INTEGER, session_id INTEGER, event_type TEXT, timestamp DATETIME)""",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_archive_creator_id ON sessions_archive (creator_id)",
+        "CREATE INDEX IF NOT EXISTS idx_participants_archive_user_id ON participants_archive (user_id)",
+    ],
+]
+
+
+def session_starts_at(date: str, time: str) -> int:
+    # Дата и время сессии хранятся в локальном времени сервера
+    return int(datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M").timestamp())
+
+
+async def apply_migrations(db: aiosqlite.Connection):
+    async with db.execute("PRAGMA user_version") as cursor:
+        version = (await cursor.fetchone())[0]
+
+    for target_version, statements in enumerate(MIGRATIONS, start=1):
+        if version >= target_version:
+            continue
+        db_logger.info("Applying database migration %s", target_version)
+        await db.execute("BEGIN")
+        try:
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(f"PRAGMA user_version = {target_version}")
+            await db.execute("COMMIT")
+        except Exception:
+            await db.execute("ROLLBACK")
+            raise
+        version = target_version
+
+
+async def enable_incremental_vacuum(db: aiosqlite.Connection):
+    # Режим auto_vacuum для существующей базы меняется только полным VACUUM, он выполняется один раз
+    async with db.execute("PRAGMA auto_vacuum") as cursor:
+        if (await cursor.fetchone())[0] == 2:
+            return
+    db_logger.info("Enabling incremental auto_vacuum, running full VACUUM once")
+    await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    await db.execute("VACUUM")
+
 
 async def init_db():
     db_logger.info("Initializing database")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with aiosqlite.connect(DATABASE_PATH, isolation_level=None) as db:
         try:
+            await enable_incremental_vacuum(db)
+
             # Создаем таблицу users, если она еще не существует
             await db.execute('''CREATE TABLE IF NOT EXISTS users
                                 (id INTEGER PRIMARY KEY, name TEXT, age INTEGER, username TEXT, is_blocked INTEGER DEFAULT 0,
@@ -36,262 +208,456 @@ async def init_db():
                                  event_type TEXT,
                                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
 
-            await db.commit()
+            await apply_migrations(db)
             db_logger.info("Database initialized successfully")
         except Exception as e:
-            db_logger.error(f"Error initializing database: {e}", exc_info=True)
+            db_logger.error("Error initializing database: %s", e, exc_info=True)
             raise
 
 
 async def save_user(name: str, age: int, username: str, user_id: int):
-    db_logger.info(f"Saving user: {user_id}, {name}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Saving user: %s, %s", user_id, name)
+    async with db_pool.writer() as db:
         try:
-            await db.execute("INSERT OR REPLACE INTO users (id, name, age, username) VALUES (?, ?, ?, ?)",
-                             (user_id, name, age, username))
-            await db.commit()
-            db_logger.info(f"User {user_id} saved successfully")
+            # Повторная регистрация сбрасывает блокировку, как раньше делал INSERT OR REPLACE,
+            # но через UPDATE, чтобы сработали триггеры статистики
+            await db.execute("""
+                INSERT INTO users (id, name, age, username) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET name = excluded.name, age = excluded.age, username = excluded.username,
+                                              is_blocked = 0, block_reason = NULL
+            """, (user_id, name, age, username))
+            db_logger.info("User %s saved successfully", user_id)
         except Exception as e:
-            db_logger.error(f"Error saving user {user_id}: {e}", exc_info=True)
+            db_logger.error("Error saving user %s: %s", user_id, e, exc_info=True)
             raise
+    blocked_users_cache.discard(user_id)
+    # Имя пользователя показывается в карточках и списке сессий
+    invalidate_session()
 
 
 async def is_user_registered(user_id: int) -> bool:
-    db_logger.info(f"Checking if user {user_id} is registered")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Checking if user %s is registered", user_id)
+    async with db_pool.reader() as db:
         try:
             async with db.execute("SELECT id FROM users WHERE id = ?", (user_id,)) as cursor:
                 result = await cursor.fetchone()
                 is_registered = result is not None
-                db_logger.info(f"User {user_id} registration status: {is_registered}")
+                db_logger.info("User %s registration status: %s", user_id, is_registered)
                 return is_registered
         except Exception as e:
-            db_logger.error(f"Error checking user registration for {user_id}: {e}", exc_info=True)
+            db_logger.error("Error checking user registration for %s: %s", user_id, e, exc_info=True)
             raise
 
 async def create_session(game: str, date: str, time: str, max_players: int, creator_id: int) -> int:
-    db_logger.info(f"Attempting to create new session. Game: {game}, Date: {date}, Time: {time}, Max Players: {max_players}, Creator ID: {creator_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Attempting to create new session. Game: %s, Date: %s, Time: %s, Max Players: %s, Creator ID: %s",
+                   game, date, time, max_players, creator_id)
+    async with db_pool.writer() as db:
         try:
             cursor = await db.execute(
-                "INSERT INTO sessions (game, date, time, max_players, creator_id) VALUES (?, ?, ?, ?, ?)",
-                (game, date, time, max_players, creator_id))
+                "INSERT INTO sessions (game, date, time, max_players, creator_id, starts_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (game, date, time, max_players, creator_id, session_starts_at(date, time)))
             session_id = cursor.lastrowid
-            await db.commit()
-            db_logger.info(f"Session created successfully. Session ID: {session_id}")
-            return session_id
-        except aiosqlite.Error as e:
-            db_logger.error(f"Database error while creating session: {e}", exc_info=True)
-            raise
-        except Exception as e:
-            db_logger.error(f"Unexpected error while creating session: {e}", exc_info=True)
-            raise
-
-
-async def join_session(session_id: int, user_id: int):
-    db_logger.info(f"Attempting to join session. Session ID: {session_id}, User ID: {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
-            await db.execute("INSERT OR IGNORE INTO participants (session_id, user_id) VALUES (?, ?)",
-                             (session_id, user_id))
-            await db.commit()
-            db_logger.info(f"User {user_id} successfully joined session {session_id}")
+            db_logger.info("Session created successfully. Session ID: %s", session_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while joining session: {e}", exc_info=True)
+            db_logger.error("Database error while creating session: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while joining session: {e}", exc_info=True)
-            raise
-
-async def get_sessions():
-    db_logger.info("Fetching all active sessions")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("""
-                SELECT s.id, s.game, s.date, s.time, s.max_players,
-                       COUNT(p.user_id) as current_players, u.name as creator_name
+            db_logger.error("Unexpected error while creating session: %s", e, exc_info=True)
+            raise
+    invalidate_session(session_id)
+    return session_id
+
+
+# Результаты join_session
+JOIN_JOINED = "joined"
+JOIN_ALREADY_JOINED = "already_joined"
+JOIN_FULL = "full"
+JOIN_NOT_FOUND = "not_found"
+
+
+# Снимок сессии одним запросом: сессия, создатель и участники со статусами подтверждения
+# и отметками о напоминаниях. Участники собираются в JSON-массив прямо в SQLite
+SESSION_SNAPSHOT_QUERY = """
+    SELECT s.id, s.game, s.date, s.time, s.max_players, s.creator_id, s.starts_at, u.name AS creator_name,
+           (SELECT json_group_array(json_array(pu.id, pu.name, pu.username, coalesce(sc.status, 'pending'),
+                                               r.user_id IS NOT NULL))
+            FROM participants p
+            JOIN users pu ON pu.id = p.user_id
+            LEFT JOIN session_confirmations sc ON sc.session_id = p.session_id AND sc.user_id = p.user_id
+            LEFT JOIN sent_reminders r ON r.session_id = p.session_id AND r.user_id = p.user_id
+            WHERE p.session_id = s.id) AS participants
+    FROM sessions s
+    JOIN users u ON s.creator_id = u.id
+    WHERE {condition}
+    ORDER BY s.starts_at ASC, s.id ASC
+"""
+
+
+async def _fetch_session_snapshots(db: aiosqlite.Connection, session_ids: List[int]) -> Dict[int, SessionSnapshot]:
+    query = SESSION_SNAPSHOT_QUERY.format(condition="s.id IN (SELECT value FROM json_each(?))")
+    async with db.execute(query, (json.dumps(list(session_ids)),)) as cursor:
+        return {row['id']: SessionSnapshot.from_row(row) for row in await cursor.fetchall()}
+
+
+async def join_session(session_id: int, user_id: int) -> Tuple[str, Optional[SessionSnapshot]]:
+    db_logger.info("Attempting to join session. Session ID: %s, User ID: %s", session_id, user_id)
+    try:
+        async with db_pool.writer() as db:
+            # Проверка вместимости и вставка одним запросом в одной транзакции
+            cursor = await db.execute("""
+                INSERT INTO participants (session_id, user_id)
+                SELECT s.id, ?
                 FROM sessions s
-                LEFT JOIN participants p ON s.id = p.session_id
-                JOIN users u ON s.creator_id = u.id
-                WHERE s.date >= date('now') and s.time >= time('now','localtime')
-                GROUP BY s.id
-                ORDER BY s.date, s.time;
-            """) as cursor:
-                sessions = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(sessions)} active sessions")
-            return sessions
-        except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching sessions: {e}", exc_info=True)
-            raise
-        except Exception as e:
-            db_logger.error(f"Unexpected error while fetching sessions: {e}", exc_info=True)
-            raise
-
-async def get_session_participants(session_id: int):
-    db_logger.info(f"Fetching participants for session ID: {session_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+                WHERE s.id = ?
+                AND (SELECT COUNT(*) FROM participants WHERE session_id = s.id) < s.max_players
+                AND NOT EXISTS (SELECT 1 FROM participants WHERE session_id = s.id AND user_id = ?)
+            """, (user_id, session_id, user_id))
+            is_joined = cursor.rowcount > 0
+            snapshot = (await _fetch_session_snapshots(db, [session_id])).get(session_id)
+    except aiosqlite.Error as e:
+        db_logger.error("Database error while joining session: %s", e, exc_info=True)
+        raise
+    except Exception as e:
+        db_logger.error("Unexpected error while joining session: %s", e, exc_info=True)
+        raise
+
+    if is_joined:
+        status = JOIN_JOINED
+    elif snapshot is None:
+        status = JOIN_NOT_FOUND
+    elif snapshot.is_participant(user_id):
+        status = JOIN_ALREADY_JOINED
+    else:
+        status = JOIN_FULL
+    db_logger.info("Join result for user %s and session %s: %s", user_id, session_id, status)
+    if status == JOIN_JOINED:
+        invalidate_session(session_id)
+        session_card_cache.set(session_id, snapshot)
+    return status, snapshot
+
+async def load_session_snapshots(session_ids: List[int]) -> Dict[int, SessionSnapshot]:
+    # Снимки любого числа сессий за один запрос, мимо кэша
+    db_logger.info("Loading snapshots for %s sessions", len(session_ids))
+    async with db_pool.reader() as db:
         try:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("""
-                SELECT u.id, u.name, u.username
-                FROM participants p
-                JOIN users u ON p.user_id = u.id
-                WHERE p.session_id = ?
-            """, (session_id,)) as cursor:
-                participants = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(participants)} participants for session {session_id}")
-            return participants
+            return await _fetch_session_snapshots(db, session_ids)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching session participants: {e}", exc_info=True)
+            db_logger.error("Database error while loading session snapshots: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching session participants: {e}", exc_info=True)
-            raise
+            db_logger.error("Unexpected error while loading session snapshots: %s", e, exc_info=True)
+            raise
+
+
+async def get_session_snapshot(session_id: int) -> Optional[SessionSnapshot]:
+    snapshot = session_card_cache.get(session_id)
+    if snapshot is not None:
+        return snapshot
+
+    version = session_card_cache.version
+    snapshot = (await load_session_snapshots([session_id])).get(session_id)
+    if snapshot is None:
+        db_logger.warning("No session found with ID %s", session_id)
+        return None
+    session_card_cache.set(session_id, snapshot, version)
+    return snapshot
+
+# Позиция в списке сессий для постраничного вывода: (starts_at, id)
+SessionCursor = Tuple[int, int]
+
+
+async def get_sessions_page(after: Optional[SessionCursor] = None, before: Optional[SessionCursor] = None,
+                            limit: int = 5) -> Tuple[List[aiosqlite.Row], bool]:
+    # Возвращает страницу сессий и признак того, что за ней (в направлении листания) есть еще
+    now = int(datetime.now().timestamp())
+    cache_key = (after, before, limit)
+    page = session_list_cache.get(cache_key)
+    if page is None:
+        db_logger.info("Fetching sessions page. After: %s, before: %s, limit: %s", after, before, limit)
+        version = session_list_cache.version
+        if before is not None:
+            condition, order, params = "AND (s.starts_at, s.id) < (?, ?)", "DESC", before
+        elif after is not None:
+            condition, order, params = "AND (s.starts_at, s.id) > (?, ?)", "ASC", after
+        else:
+            condition, order, params = "", "ASC", ()
+        async with db_pool.reader() as db:
+            try:
+                async with db.execute(f"""
+                    SELECT s.id, s.game, s.date, s.time, s.max_players,
+                           (SELECT COUNT(*) FROM participants p WHERE p.session_id = s.id) as current_players,
+                           u.name as creator_name, s.starts_at
+                    FROM sessions s
+                    JOIN users u ON s.creator_id = u.id
+                    WHERE s.starts_at >= ? {condition}
+                    ORDER BY s.starts_at {order}, s.id {order}
+                    LIMIT ?
+                """, (now, *params, limit + 1)) as cursor:
+                    sessions = await cursor.fetchall()
+            except aiosqlite.Error as e:
+                db_logger.error("Database error while fetching sessions page: %s", e, exc_info=True)
+                raise
+            except Exception as e:
+                db_logger.error("Unexpected error while fetching sessions page: %s", e, exc_info=True)
+                raise
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+        if before is not None:
+            sessions.reverse()
+        page = (sessions, has_more)
+        session_list_cache.set(cache_key, page, version)
+        db_logger.info("Retrieved %s sessions for page", len(sessions))
+
+    sessions, has_more = page
+    # Сессии, начавшиеся после заполнения кэша, отбрасываем при чтении
+    return [session for session in sessions if session['starts_at'] >= now], has_more
 
 async def leave_session(session_id: int, user_id: int):
-    db_logger.info(f"Attempting to remove user from session. Session ID: {session_id}, User ID: {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Attempting to remove user from session. Session ID: %s, User ID: %s", session_id, user_id)
+    async with db_pool.writer() as db:
         try:
             await db.execute("DELETE FROM participants WHERE session_id = ? AND user_id = ?", (session_id, user_id))
-            await db.commit()
-            db_logger.info(f"User {user_id} successfully left session {session_id}")
+            db_logger.info("User %s successfully left session %s", user_id, session_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while leaving session: {e}", exc_info=True)
+            db_logger.error("Database error while leaving session: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while leaving session: {e}", exc_info=True)
+            db_logger.error("Unexpected error while leaving session: %s", e, exc_info=True)
             raise
+    invalidate_session(session_id)
 
 
 async def get_blocked_users():
     db_logger.info("Fetching list of blocked users")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.reader() as db:
         try:
-            db.row_factory = aiosqlite.Row
             async with db.execute("SELECT id, name, block_reason FROM users WHERE is_blocked = 1") as cursor:
                 blocked_users = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(blocked_users)} blocked users")
+            db_logger.info("Retrieved %s blocked users", len(blocked_users))
             return blocked_users
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching blocked users: {e}", exc_info=True)
+            db_logger.error("Database error while fetching blocked users: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching blocked users: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching blocked users: %s", e, exc_info=True)
             raise
 
-async def is_user_blocked(user_id: int) -> bool:
-    db_logger.info(f"Checking if user {user_id} is blocked")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_blocked_user_ids() -> List[int]:
+    db_logger.info("Fetching blocked user IDs")
+    async with db_pool.reader() as db:
         try:
-            async with db.execute("SELECT is_blocked FROM users WHERE id = ?", (user_id,)) as cursor:
-                result = await cursor.fetchone()
-                is_blocked = result[0] if result else False
-            db_logger.info(f"User {user_id} blocked status: {is_blocked}")
-            return is_blocked
+            async with db.execute("SELECT id FROM users WHERE is_blocked = 1") as cursor:
+                user_ids = [row[0] for row in await cursor.fetchall()]
+            db_logger.info("Retrieved %s blocked user IDs", len(user_ids))
+            return user_ids
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while checking user blocked status: {e}", exc_info=True)
+            db_logger.error("Database error while fetching blocked user IDs: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while checking user blocked status: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching blocked user IDs: %s", e, exc_info=True)
             raise
 
-async def get_all_users():
-    db_logger.info("Fetching all users")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def load_blocked_users_cache():
+    blocked_users_cache.load(await get_blocked_user_ids())
+    db_logger.info("Blocked users cache loaded: %s", blocked_users_cache.stats())
+
+async def is_user_blocked(user_id: int) -> bool:
+    # Проверка идет по кэшу в памяти, в базу обращаемся только при первой загрузке
+    is_blocked = blocked_users_cache.lookup(user_id)
+    if is_blocked is None:
+        await load_blocked_users_cache()
+        is_blocked = blocked_users_cache.is_blocked(user_id)
+    return is_blocked
+
+# Самые длинные ID пользователей Telegram - 16 цифр
+USER_ID_MAX_DIGITS = 16
+
+
+def _user_search_condition(query: str) -> Tuple[str, tuple]:
+    # Поиск по началу ID или имени сводится к диапазонам, которые идут по индексу.
+    # ID не начинается с нуля и не длиннее USER_ID_MAX_DIGITS: такие строки ищем только по имени
+    if query.isascii() and query.isdigit() and not query.startswith('0') and len(query) <= USER_ID_MAX_DIGITS:
+        prefix = int(query)
+        ranges = [(prefix * 10 ** k, (prefix + 1) * 10 ** k - 1)
+                  for k in range(USER_ID_MAX_DIGITS - len(query) + 1)]
+        condition = " OR ".join("id BETWEEN ? AND ?" for _ in ranges)
+        return f"({condition})", tuple(bound for id_range in ranges for bound in id_range)
+    upper_bound = query[:-1] + chr(ord(query[-1]) + 1)
+    return "(name >= ? AND name < ?)", (query, upper_bound)
+
+
+async def get_users_page(after: Optional[int] = None, before: Optional[int] = None, query: Optional[str] = None,
+                         limit: int = 20) -> Tuple[List[aiosqlite.Row], bool]:
+    # Возвращает страницу пользователей по возрастанию ID и признак того,
+    # что за ней (в направлении листания) есть еще
+    db_logger.info("Fetching users page. After: %s, before: %s, query: %s, limit: %s", after, before, query, limit)
+    conditions, params = [], []
+    if query:
+        condition, condition_params = _user_search_condition(query)
+        conditions.append(condition)
+        params.extend(condition_params)
+    order = "ASC"
+    if before is not None:
+        conditions.append("id < ?")
+        params.append(before)
+        order = "DESC"
+    elif after is not None:
+        conditions.append("id > ?")
+        params.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    async with db_pool.reader() as db:
         try:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT id, name, age FROM users") as cursor:
+            async with db.execute(f"""
+                SELECT id, name, age, username, is_blocked
+                FROM users
+                {where}
+                ORDER BY id {order}
+                LIMIT ?
+            """, (*params, limit + 1)) as cursor:
                 users = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(users)} users")
-            return users
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching all users: {e}", exc_info=True)
+            db_logger.error("Database error while fetching users page: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching all users: {e}", exc_info=True)
-            raise
+            db_logger.error("Unexpected error while fetching users page: %s", e, exc_info=True)
+            raise
+    has_more = len(users) > limit
+    users = users[:limit]
+    if before is not None:
+        users.reverse()
+    db_logger.info("Retrieved %s users for page", len(users))
+    return users, has_more
+
+
+async def iter_users(chunk_size: int = 1000):
+    # Обходит всех пользователей порциями; соединение занято только на время одной порции
+    last_id = -2 ** 63
+    while True:
+        async with db_pool.reader() as db:
+            try:
+                async with db.execute("""
+                    SELECT id, name, age, username, is_blocked, block_reason
+                    FROM users
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, chunk_size)) as cursor:
+                    users = await cursor.fetchall()
+            except aiosqlite.Error as e:
+                db_logger.error("Database error while iterating users: %s", e, exc_info=True)
+                raise
+        if not users:
+            return
+        yield users
+        if len(users) < chunk_size:
+            return
+        last_id = users[-1]['id']
 
 async def block_user(user_id: int, reason: str):
-    db_logger.info(f"Attempting to block user {user_id}. Reason: {reason}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Attempting to block user %s. Reason: %s", user_id, reason)
+    async with db_pool.writer() as db:
         try:
-            await db.execute("UPDATE users SET is_blocked = 1, block_reason = ? WHERE id = ?", (reason, user_id))
-            await db.commit()
-            db_logger.info(f"User {user_id} has been successfully blocked")
+            cursor = await db.execute("UPDATE users SET is_blocked = 1, block_reason = ? WHERE id = ?",
+                                      (reason, user_id))
+            is_updated = cursor.rowcount > 0
+            db_logger.info("User %s has been successfully blocked", user_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while blocking user: {e}", exc_info=True)
+            db_logger.error("Database error while blocking user: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while blocking user: {e}", exc_info=True)
+            db_logger.error("Unexpected error while blocking user: %s", e, exc_info=True)
             raise
+    if is_updated:
+        blocked_users_cache.add(user_id)
 
 async def unblock_user(user_id: int):
-    db_logger.info(f"Attempting to unblock user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Attempting to unblock user %s", user_id)
+    async with db_pool.writer() as db:
         try:
             await db.execute("UPDATE users SET is_blocked = 0, block_reason = NULL WHERE id = ?", (user_id,))
-            await db.commit()
-            db_logger.info(f"User {user_id} has been successfully unblocked")
+            db_logger.info("User %s has been successfully unblocked", user_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while unblocking user: {e}", exc_info=True)
+            db_logger.error("Database error while unblocking user: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while unblocking user: {e}", exc_info=True)
+            db_logger.error("Unexpected error while unblocking user: %s", e, exc_info=True)
             raise
+    blocked_users_cache.discard(user_id)
 
 
 async def get_user_statistics():
     db_logger.info("Fetching user statistics")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.reader() as db:
         try:
-            async with db.execute("SELECT COUNT(*) FROM users") as cursor:
-                total_users = (await cursor.fetchone())[0]
-            async with db.execute("SELECT COUNT(*) FROM users WHERE is_blocked = 0") as cursor:
-                active_users = (await cursor.fetchone())[0]
-            async with db.execute("SELECT COUNT(*) FROM users WHERE is_blocked = 1") as cursor:
-                blocked_users = (await cursor.fetchone())[0]
-            async with db.execute("SELECT COUNT(*) FROM sessions") as cursor:
-                total_sessions = (await cursor.fetchone())[0]
-
-            avg_sessions_per_user = total_sessions / total_users if total_users > 0 else 0
-
-            stats = {
-                "total_users": total_users,
-                "active_users": active_users,
-                "blocked_users": blocked_users,
-                "total_sessions": total_sessions,
-                "avg_sessions_per_user": avg_sessions_per_user
-            }
-            db_logger.info(f"User statistics retrieved: {stats}")
-            return stats
+            async with db.execute("SELECT name, value FROM stats_counters") as cursor:
+                counters = {row['name']: row['value'] for row in await cursor.fetchall()}
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching user statistics: {e}", exc_info=True)
+            db_logger.error("Database error while fetching user statistics: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching user statistics: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching user statistics: %s", e, exc_info=True)
+            raise
+
+    total_users = counters.get('users_total', 0)
+    blocked_users = counters.get('users_blocked', 0)
+    total_sessions = counters.get('sessions_total', 0)
+    confirmed = counters.get('confirmed', 0)
+    declined = counters.get('declined', 0)
+    stats = {
+        "total_users": total_users,
+        "active_users": total_users - blocked_users,
+        "blocked_users": blocked_users,
+        "total_sessions": total_sessions,
+        "avg_sessions_per_user": total_sessions / total_users if total_users > 0 else 0,
+        "participations": counters.get('participations', 0),
+        "confirmed": confirmed,
+        "declined": declined,
+        "confirm_rate": confirmed / (confirmed + declined) if confirmed + declined > 0 else 0,
+    }
+    db_logger.info("User statistics retrieved: %s", stats)
+    return stats
+
+
+async def get_daily_statistics(days: int = 7) -> List[aiosqlite.Row]:
+    db_logger.info("Fetching daily statistics for %s days", days)
+    async with db_pool.reader() as db:
+        try:
+            async with db.execute("""
+                SELECT day, sessions_created, joins, confirmed, declined
+                FROM stats_daily
+                WHERE day > date('now', 'localtime', ?)
+                ORDER BY day
+            """, (f"-{int(days)} days",)) as cursor:
+                return await cursor.fetchall()
+        except aiosqlite.Error as e:
+            db_logger.error("Database error while fetching daily statistics: %s", e, exc_info=True)
+            raise
+        except Exception as e:
+            db_logger.error("Unexpected error while fetching daily statistics: %s", e, exc_info=True)
             raise
 
 
 async def get_user_info(user_id: int) -> Optional[Dict[str, any]]:
-    db_logger.info(f"Fetching info for user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    db_logger.info("Fetching info for user %s", user_id)
+    async with db_pool.reader() as db:
         try:
             async with db.execute("SELECT name, age FROM users WHERE id = ?", (user_id,)) as cursor:
                 user = await cursor.fetchone()
 
             if not user:
-                db_logger.warning(f"No user found with ID {user_id}")
+                db_logger.warning("No user found with ID %s", user_id)
                 return None
 
-            async with db.execute("SELECT COUNT(*) as created_sessions FROM sessions WHERE creator_id = ?",
-                                  (user_id,)) as cursor:
-                created_sessions = (await cursor.fetchone())['created_sessions']
-
-            async with db.execute("SELECT COUNT(*) as attended_sessions FROM participants WHERE user_id = ?",
-                                  (user_id,)) as cursor:
-                attended_sessions = (await cursor.fetchone())['attended_sessions']
+            # Завершившиеся сессии лежат в архиве, считаем обе таблицы
+            async with db.execute("""
+                SELECT (SELECT COUNT(*) FROM sessions WHERE creator_id = ?)
+                     + (SELECT COUNT(*) FROM sessions_archive WHERE creator_id = ?) as created_sessions,
+                       (SELECT COUNT(*) FROM participants WHERE user_id = ?)
+                     + (SELECT COUNT(*) FROM participants_archive WHERE user_id = ?) as attended_sessions
+            """, (user_id, user_id, user_id, user_id)) as cursor:
+                counts = await cursor.fetchone()
+            created_sessions = counts['created_sessions']
+            attended_sessions = counts['attended_sessions']
 
             user_info = {
                 'name': user['name'],
@@ -299,179 +665,135 @@ async def get_user_info(user_id: int) -> Optional[Dict[str, any]]:
                 'created_sessions': created_sessions,
                 'attended_sessions': attended_sessions
             }
-            db_logger.info(f"User info retrieved for user {user_id}: {user_info}")
+            db_logger.info("User info retrieved for user %s: %s", user_id, user_info)
             return user_info
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching user info: {e}", exc_info=True)
+            db_logger.error("Database error while fetching user info: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching user info: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching user info: %s", e, exc_info=True)
             raise
 
 
-async def get_user_sessions(user_id: int) -> Optional[List[Dict[str, any]]]:
-    db_logger.info(f"Fetching sessions for user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_user_session_snapshots(user_id: int) -> List[SessionSnapshot]:
+    db_logger.info("Fetching sessions for user %s", user_id)
+    async with db_pool.reader() as db:
         try:
-            current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-            async with db.execute("""
-                SELECT id, game, date, time, max_players, 
-                       (SELECT COUNT(*) FROM participants WHERE session_id = sessions.id) as current_players,
-                       creator_id = ? as is_creator
-                FROM sessions
-                WHERE (creator_id = ? OR id IN (SELECT session_id FROM participants WHERE user_id = ?))
-                AND datetime(date || ' ' || time) >= datetime(?)
-                ORDER BY date ASC, time ASC
-            """, (user_id, user_id, user_id, current_datetime)) as cursor:
-                sessions = await cursor.fetchall()
-
-            all_sessions = [dict(session) for session in sessions]
-
-            db_logger.info(f"Retrieved {len(all_sessions)} sessions for user {user_id}")
-            return all_sessions
+            now = int(datetime.now().timestamp())
+            query = SESSION_SNAPSHOT_QUERY.format(condition="""
+                s.id IN (SELECT id FROM sessions WHERE creator_id = ?
+                         UNION
+                         SELECT session_id FROM participants WHERE user_id = ?)
+                AND s.starts_at >= ?
+            """)
+            async with db.execute(query, (user_id, user_id, now)) as cursor:
+                sessions = [SessionSnapshot.from_row(row) for row in await cursor.fetchall()]
+
+            db_logger.info("Retrieved %s sessions for user %s", len(sessions), user_id)
+            return sessions
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching user sessions: {e}", exc_info=True)
+            db_logger.error("Database error while fetching user sessions: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching user sessions: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching user sessions: %s", e, exc_info=True)
             raise
 
 
-async def get_upcoming_sessions(hours_before=2):
-    db_logger.info(f"Fetching upcoming sessions for next {hours_before} hours")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_future_session_starts():
+    db_logger.info("Fetching start times of future sessions")
+    async with db_pool.reader() as db:
         try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            future_time = (datetime.now() + timedelta(hours=hours_before)).strftime("%Y-%m-%d %H:%M")
-            query = """
-            SELECT s.id, s.game, s.date, s.time, p.user_id
-            FROM sessions s
-            JOIN participants p ON s.id = p.session_id
-            LEFT JOIN session_confirmations sc ON s.id = sc.session_id AND p.user_id = sc.user_id
-            WHERE datetime(s.date || ' ' || s.time) BETWEEN ? AND ?
-            AND (sc.status IS NULL OR sc.status = 'pending')
-            """
-            async with db.execute(query, (current_time, future_time)) as cursor:
+            async with db.execute("SELECT id, starts_at FROM sessions WHERE starts_at > ?",
+                                  (int(datetime.now().timestamp()),)) as cursor:
                 sessions = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(sessions)} upcoming sessions")
+            db_logger.info("Retrieved %s future sessions", len(sessions))
             return sessions
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching upcoming sessions: {e}", exc_info=True)
+            db_logger.error("Database error while fetching future sessions: %s", e, exc_info=True)
+            raise
+        except Exception as e:
+            db_logger.error("Unexpected error while fetching future sessions: %s", e, exc_info=True)
+            raise
+
+
+async def mark_reminders_sent(session_id: int, user_ids: List[int]):
+    db_logger.info("Marking reminders sent for session %s to %s users", session_id, len(user_ids))
+    async with db_pool.writer() as db:
+        try:
+            sent_at = int(datetime.now().timestamp())
+            await db.executemany(
+                "INSERT OR IGNORE INTO sent_reminders (session_id, user_id, sent_at) VALUES (?, ?, ?)",
+                [(session_id, user_id, sent_at) for user_id in user_ids])
+        except aiosqlite.Error as e:
+            db_logger.error("Database error while marking reminders sent: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching upcoming sessions: {e}", exc_info=True)
+            db_logger.error("Unexpected error while marking reminders sent: %s", e, exc_info=True)
             raise
+    # Отметки о напоминаниях входят в снимок сессии
+    session_card_cache.pop(session_id)
 
 
 async def update_session_confirmation(session_id: int, user_id: int, status: str):
-    db_logger.info(f"Updating session confirmation. Session ID: {session_id}, User ID: {user_id}, Status: {status}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Updating session confirmation. Session ID: %s, User ID: %s, Status: %s", session_id, user_id, status)
+    async with db_pool.writer() as db:
         try:
             await db.execute("""
             INSERT INTO session_confirmations (session_id, user_id, status)
             VALUES (?, ?, ?)
             ON CONFLICT(session_id, user_id) DO UPDATE SET status = ?
             """, (session_id, user_id, status, status))
-            await db.commit()
-            db_logger.info(f"Session confirmation updated successfully for session {session_id} and user {user_id}")
+            db_logger.info("Session confirmation updated successfully for session %s and user %s", session_id, user_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while updating session confirmation: {e}", exc_info=True)
+            db_logger.error("Database error while updating session confirmation: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while updating session confirmation: {e}", exc_info=True)
+            db_logger.error("Unexpected error while updating session confirmation: %s", e, exc_info=True)
             raise
+    # Статусы подтверждения входят в снимок сессии
+    session_card_cache.pop(session_id)
 
 async def remove_participant(session_id: int, user_id: int):
-    db_logger.info(f"Removing participant. Session ID: {session_id}, User ID: {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Removing participant. Session ID: %s, User ID: %s", session_id, user_id)
+    async with db_pool.writer() as db:
         try:
             await db.execute("DELETE FROM participants WHERE session_id = ? AND user_id = ?", (session_id, user_id))
-            await db.commit()
-            db_logger.info(f"Participant (User ID: {user_id}) removed successfully from session {session_id}")
-        except aiosqlite.Error as e:
-            db_logger.error(f"Database error while removing participant: {e}", exc_info=True)
-            raise
-        except Exception as e:
-            db_logger.error(f"Unexpected error while removing participant: {e}", exc_info=True)
-            raise
-
-async def get_session_participants(session_id: int):
-    db_logger.info(f"Fetching participants for session ID: {session_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        try:
-            async with db.execute("""
-                SELECT u.id, u.name, u.username
-                FROM participants p
-                JOIN users u ON p.user_id = u.id
-                WHERE p.session_id = ?
-            """, (session_id,)) as cursor:
-                participants = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(participants)} participants for session {session_id}")
-            return participants
+            db_logger.info("Participant (User ID: %s) removed successfully from session %s", user_id, session_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching session participants: {e}", exc_info=True)
+            db_logger.error("Database error while removing participant: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching session participants: {e}", exc_info=True)
-            raise
-
-async def get_session_info(session_id: int) -> Optional[Dict[str, any]]:
-    db_logger.info(f"Fetching info for session ID: {session_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        try:
-            async with db.execute("""
-                SELECT s.id, s.game, s.date, s.time, s.max_players, s.creator_id, u.name as creator_name
-                FROM sessions s
-                JOIN users u ON s.creator_id = u.id
-                WHERE s.id = ?
-            """, (session_id,)) as cursor:
-                session = await cursor.fetchone()
-            if session:
-                session_dict = dict(session)
-                db_logger.info(f"Session info retrieved for session {session_id}: {session_dict}")
-                return session_dict
-            else:
-                db_logger.warning(f"No session found with ID {session_id}")
-                return None
-        except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching session info: {e}", exc_info=True)
-            raise
-        except Exception as e:
-            db_logger.error(f"Unexpected error while fetching session info: {e}", exc_info=True)
+            db_logger.error("Unexpected error while removing participant: %s", e, exc_info=True)
             raise
+    invalidate_session(session_id)
 
 async def update_user_info(user_id: int, name: str = None, age: int = None):
-    db_logger.info(f"Updating user info for user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Updating user info for user %s", user_id)
+    async with db_pool.writer() as db:
         try:
             if name is not None:
                 await db.execute("UPDATE users SET name = ? WHERE id = ?", (name, user_id))
             if age is not None:
                 await db.execute("UPDATE users SET age = ? WHERE id = ?", (age, user_id))
-            await db.commit()
-            db_logger.info(f"User info updated successfully for user {user_id}")
+            db_logger.info("User info updated successfully for user %s", user_id)
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while updating user info: {e}", exc_info=True)
+            db_logger.error("Database error while updating user info: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while updating user info: {e}", exc_info=True)
+            db_logger.error("Unexpected error while updating user info: %s", e, exc_info=True)
             raise
+    invalidate_session()
 
 
 async def delete_session(session_id: int, user_id: int) -> bool:
-    db_logger.info(f"Attempting to delete session {session_id} by user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
+    db_logger.info("Attempting to delete session %s by user %s", session_id, user_id)
+    try:
+        async with db_pool.writer() as db:
             # Проверяем, является ли пользователь создателем сессии
             async with db.execute("SELECT creator_id FROM sessions WHERE id = ?", (session_id,)) as cursor:
                 result = await cursor.fetchone()
                 if not result or result[0] != user_id:
-                    db_logger.warning(f"User {user_id} attempted to delete session {session_id} without permission")
+                    db_logger.warning("User %s attempted to delete session %s without permission", user_id, session_id)
                     return False
 
             # Удаляем записи из таблицы participants
@@ -480,65 +802,203 @@ async def delete_session(session_id: int, user_id: int) -> bool:
             # Удаляем записи из таблицы session_confirmations
             await db.execute("DELETE FROM session_confirmations WHERE session_id = ?", (session_id,))
 
+            # Удаляем отметки об отправленных напоминаниях
+            await db.execute("DELETE FROM sent_reminders WHERE session_id = ?", (session_id,))
+
             # Удаляем саму сессию
             await db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
 
-            await db.commit()
-            db_logger.info(f"Successfully deleted session {session_id}")
-            return True
-        except Exception as e:
-            db_logger.error(f"Error deleting session {session_id}: {e}", exc_info=True)
-            return False
-
-async def get_user_session_history(user_id: int):
-    db_logger.info(f"Fetching session history for user {user_id}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        invalidate_session(session_id)
+        db_logger.info("Successfully deleted session %s", session_id)
+        return True
+    except Exception as e:
+        db_logger.error("Error deleting session %s: %s", session_id, e, exc_info=True)
+        return False
+
+# Позиция в истории событий: (timestamp в epoch, id)
+HistoryCursor = Tuple[int, int]
+
+
+async def get_user_session_history(user_id: int, older_than: Optional[HistoryCursor] = None,
+                                   newer_than: Optional[HistoryCursor] = None, session_id: Optional[int] = None,
+                                   event_type: Optional[str] = None,
+                                   limit: int = 10) -> Tuple[List[Dict[str, any]], bool]:
+    # События сессий, в которых пользователь участвует сейчас, от новых к старым.
+    # Возвращает одну страницу и признак того, что за ней (в направлении листания) есть еще
+    db_logger.info("Fetching session history for user %s. Older than: %s, "
+                   "newer than: %s, session: %s, event type: %s",
+                   user_id, older_than, newer_than, session_id, event_type)
+    today_start = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    conditions, params = [], [user_id, today_start]
+    if session_id is not None:
+        conditions.append("AND use.session_id = ?")
+        params.append(session_id)
+    if event_type is not None:
+        conditions.append("AND use.event_type = ?")
+        params.append(event_type)
+    order = "DESC"
+    if newer_than is not None:
+        conditions.append("AND (use.timestamp, use.id) > (datetime(?, 'unixepoch'), ?)")
+        params.extend(newer_than)
+        order = "ASC"
+    elif older_than is not None:
+        conditions.append("AND (use.timestamp, use.id) < (datetime(?, 'unixepoch'), ?)")
+        params.extend(older_than)
+    async with db_pool.reader() as db:
         try:
-            query = """
-            WITH current_sessions AS (
-                SELECT DISTINCT session_id
-                FROM participants
-                WHERE user_id = ? AND session_id IN (
-                    SELECT id FROM sessions WHERE date >= date('now')
-                )
-                EXCEPT
-                SELECT session_id
-                FROM user_session_events
-                WHERE user_id = ? AND event_type = 'left'
-            )
-            SELECT use.session_id, use.event_type, use.timestamp, u.name as user_name, s.game
+            query = f"""
+            SELECT use.id, use.session_id, use.event_type, use.timestamp,
+                   CAST(strftime('%s', use.timestamp) AS INTEGER) as ts, u.name as user_name, s.game
             FROM user_session_events use
             JOIN sessions s ON use.session_id = s.id
             JOIN users u ON use.user_id = u.id
-            WHERE use.session_id IN (SELECT session_id FROM current_sessions)
-            ORDER BY use.timestamp DESC
-            LIMIT 50
+            WHERE use.session_id IN (
+                SELECT p.session_id
+                FROM participants p
+                JOIN sessions cs ON cs.id = p.session_id
+                WHERE p.user_id = ? AND cs.starts_at >= ?
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM user_session_events e
+                    WHERE e.user_id = p.user_id AND e.event_type = 'left' AND e.session_id = p.session_id
+                )
+            )
+            {' '.join(conditions)}
+            ORDER BY use.timestamp {order}, use.id {order}
+            LIMIT ?
             """
-            async with db.execute(query, (user_id, user_id)) as cursor:
+            async with db.execute(query, (*params, limit + 1)) as cursor:
                 history = await cursor.fetchall()
-            db_logger.info(f"Retrieved {len(history)} history events for sessions user {user_id} is currently participating in")
-            return [dict(event) for event in history]
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while fetching user session history: {e}", exc_info=True)
+            db_logger.error("Database error while fetching user session history: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while fetching user session history: {e}", exc_info=True)
+            db_logger.error("Unexpected error while fetching user session history: %s", e, exc_info=True)
             raise
+    has_more = len(history) > limit
+    history = [dict(event) for event in history[:limit]]
+    if newer_than is not None:
+        history.reverse()
+    db_logger.info("Retrieved %s history events for user %s", len(history), user_id)
+    return history, has_more
 
 async def add_user_session_event(user_id: int, session_id: int, event_type: str):
-    db_logger.info(f"Adding session event for user {user_id}, session {session_id}, event type: {event_type}")
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db_logger.info("Adding session event for user %s, session %s, event type: %s", user_id, session_id, event_type)
+    async with db_pool.writer() as db:
         try:
             await db.execute("""
                 INSERT INTO user_session_events (user_id, session_id, event_type)
                 VALUES (?, ?, ?)
             """, (user_id, session_id, event_type))
-            await db.commit()
-            db_logger.info(f"Session event added successfully")
+            db_logger.info("Session event added successfully")
         except aiosqlite.Error as e:
-            db_logger.error(f"Database error while adding session event: {e}", exc_info=True)
+            db_logger.error("Database error while adding session event: %s", e, exc_info=True)
             raise
         except Exception as e:
-            db_logger.error(f"Unexpected error while adding session event: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            db_logger.error("Unexpected error while adding session event: %s", e, exc_info=True)
+            raise
+
+
+async def archive_finished_sessions(finished_before: int, limit: int = 500) -> int:
+    # Переносит до limit сессий, начавшихся раньше finished_before, вместе с участниками,
+    # подтверждениями и событиями в архив. Возвращает число перенесенных сессий
+    try:
+        async with db_pool.writer() as db:
+            async with db.execute("SELECT id FROM sessions WHERE starts_at < ? ORDER BY starts_at LIMIT ?",
+                                  (finished_before, limit)) as cursor:
+                session_ids = [row['id'] for row in await cursor.fetchall()]
+            if not session_ids:
+                return 0
+            ids = json.dumps(session_ids)
+            async with db.execute("""
+                SELECT (SELECT COUNT(*) FROM participants
+                        WHERE session_id IN (SELECT value FROM json_each(?))) as participations,
+                       (SELECT COUNT(*) FROM session_confirmations
+                        WHERE session_id IN (SELECT value FROM json_each(?)) AND status = 'confirmed') as confirmed,
+                       (SELECT COUNT(*) FROM session_confirmations
+                        WHERE session_id IN (SELECT value FROM json_each(?)) AND status = 'declined') as declined
+            """, (ids, ids, ids)) as cursor:
+                moved = await cursor.fetchone()
+
+            await db.execute("""
+                INSERT OR REPLACE INTO sessions_archive
+                SELECT id, game, date, time, max_players, creator_id, starts_at, ?
+                FROM sessions WHERE id IN (SELECT value FROM json_each(?))
+            """, (int(datetime.now().timestamp()), ids))
+            await db.execute("""
+                INSERT OR IGNORE INTO participants_archive
+                SELECT session_id, user_id FROM participants WHERE session_id IN (SELECT value FROM json_each(?))
+            """, (ids,))
+            await db.execute("""
+                INSERT OR REPLACE INTO session_confirmations_archive
+                SELECT session_id, user_id, status FROM session_confirmations
+                WHERE session_id IN (SELECT value FROM json_each(?))
+            """, (ids,))
+            await db.execute("""
+                INSERT OR IGNORE INTO user_session_events_archive
+                SELECT id, user_id, session_id, event_type, timestamp FROM user_session_events
+                WHERE session_id IN (SELECT value FROM json_each(?))
+            """, (ids,))
+            for table in ('user_session_events', 'session_confirmations', 'participants', 'sent_reminders'):
+                await db.execute(f"DELETE FROM {table} WHERE session_id IN (SELECT value FROM json_each(?))", (ids,))
+            await db.execute("DELETE FROM sessions WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+
+            # Триггеры статистики уменьшили счетчики при удалении, а архивные строки в них учитываются
+            for name, value in (('sessions_total', len(session_ids)), ('participations', moved['participations']),
+                                ('confirmed', moved['confirmed']), ('declined', moved['declined'])):
+                await db.execute("UPDATE stats_counters SET value = value + ? WHERE name = ?", (value, name))
+    except aiosqlite.Error as e:
+        db_logger.error("Database error while archiving sessions: %s", e, exc_info=True)
+        raise
+    except Exception as e:
+        db_logger.error("Unexpected error while archiving sessions: %s", e, exc_info=True)
+        raise
+    invalidate_session()
+    db_logger.info("Archived %s finished sessions", len(session_ids))
+    return len(session_ids)
+
+
+async def archive_orphan_events(limit: int = 1000) -> int:
+    # События удаленных сессий больше нигде не показываются, переносим их в архив
+    try:
+        async with db_pool.writer() as db:
+            async with db.execute("""
+                SELECT e.id FROM user_session_events e
+                WHERE NOT EXISTS (SELECT 1 FROM sessions s WHERE s.id = e.session_id)
+                ORDER BY e.id LIMIT ?
+            """, (limit,)) as cursor:
+                event_ids = [row['id'] for row in await cursor.fetchall()]
+            if not event_ids:
+                return 0
+            ids = json.dumps(event_ids)
+            await db.execute("""
+                INSERT OR IGNORE INTO user_session_events_archive
+                SELECT id, user_id, session_id, event_type, timestamp FROM user_session_events
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (ids,))
+            await db.execute("DELETE FROM user_session_events WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+    except aiosqlite.Error as e:
+        db_logger.error("Database error while archiving orphan events: %s", e, exc_info=True)
+        raise
+    db_logger.info("Archived %s events of deleted sessions", len(event_ids))
+    return len(event_ids)
+
+
+async def incremental_vacuum(pages: int) -> int:
+    # Возвращает файлу до pages свободных страниц, оставшихся после удаления строк
+    async with db_pool.reader() as db:
+        async with db.execute("PRAGMA freelist_count") as cursor:
+            free_pages = (await cursor.fetchone())[0]
+    if not free_pages:
+        return 0
+    released = min(free_pages, pages)
+    async with db_pool.writer() as db:
+        # sqlite3 делает один шаг запроса на execute, а incremental_vacuum освобождает
+        # по странице за шаг, поэтому прогоняем прагму нужное число раз
+        await db.executemany("PRAGMA incremental_vacuum(1)", [()] * released)
+    db_logger.info("Incremental vacuum released %s of %s free pages", released, free_pages)
+    return released
+
+
+# Время выполнения каждой функции модуля попадает в метрики
+instrument_module(globals())
@@ -0,0 +1,235 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+import aiosqlite
+
+from app.config_reader import config
+from app.services.db_profiler import profiled
+from app.utils.logger import db_logger
+
+
+class _WriteRequest:
+    __slots__ = ('granted', 'released', 'committed')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        # Задача записи выдает соединение -> вызывающий код выполняет запросы -> ждет коммита
+        self.granted = loop.create_future()
+        self.released = loop.create_future()
+        self.committed = loop.create_future()
+
+    def fail(self, error: BaseException):
+        # Снимает с ожидания вызывающий код, который еще ждет соединения или коммита
+        if not self.granted.done():
+            self.granted.set_exception(error)
+            return
+        if self.granted.cancelled() or self.committed.done():
+            return
+        # Если блок записи сам завершился ошибкой, коммита никто не ждет
+        if self.released.done() and self.released.result() is not None:
+            return
+        self.committed.set_exception(error)
+
+
+# Запрос на запись, внутри блока которого сейчас выполняется эта задача
+_current_write: ContextVar[Optional[_WriteRequest]] = ContextVar('_current_write', default=None)
+
+
+# Долгоживущие соединения с SQLite: одно на запись и несколько на чтение.
+# Все записи проходят через одну задачу, которая объединяет запросы,
+# пришедшие в течение batch_window, в одну транзакцию (один fsync на пачку).
+class ConnectionPool:
+    def __init__(self, readers: int = 4, journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 busy_timeout_ms: int = 5000, cache_size_kib: int = 16384, mmap_size: int = 0,
+                 batch_window: float = 0.005, batch_size: int = 100):
+        self.readers_count = readers
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.database_path: Optional[str] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._connections: List[aiosqlite.Connection] = []
+
+    @property
+    def is_started(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, **kwargs) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.database_path, **kwargs)
+        connection.row_factory = aiosqlite.Row
+        await connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        await connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        await connection.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        await connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        await connection.execute("PRAGMA temp_store = MEMORY")
+        self._connections.append(connection)
+        return connection
+
+    async def start(self, database_path: str):
+        if self.is_started:
+            return
+        db_logger.info("Starting connection pool for %s with %s readers", database_path, self.readers_count)
+        self.database_path = database_path
+        # Транзакциями писателя управляем вручную (BEGIN/COMMIT)
+        self._writer = await self._connect(isolation_level=None)
+        async with self._writer.execute(f"PRAGMA journal_mode = {self.journal_mode}") as cursor:
+            journal_mode = (await cursor.fetchone())[0]
+        db_logger.info("SQLite journal mode: %s", journal_mode)
+
+        self._readers = asyncio.Queue()
+        for _ in range(self.readers_count):
+            self._readers.put_nowait(await self._connect())
+
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def close(self):
+        if not self.is_started:
+            return
+        db_logger.info("Closing connection pool")
+        # Дожидаемся, пока задача записи обработает уже поставленные запросы
+        while not self._write_queue.empty():
+            await asyncio.sleep(self.batch_window)
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        for connection in self._connections:
+            try:
+                await connection.close()
+            except Exception as e:
+                db_logger.error("Error closing database connection: %s", e, exc_info=True)
+        self._connections.clear()
+        self._writer = None
+        self._writer_task = None
+        self._write_queue = None
+        self._readers = None
+
+    async def set_trace_callback(self, callback):
+        # Вызывается для каждого SQL-выражения на всех соединениях пула (из потоков aiosqlite)
+        for connection in self._connections:
+            await connection.set_trace_callback(callback)
+
+    def _ensure_started(self):
+        if not self.is_started:
+            raise RuntimeError("Connection pool is not started")
+
+    @asynccontextmanager
+    async def reader(self):
+        self._ensure_started()
+        readers = self._readers
+        connection = await readers.get()
+        try:
+            yield profiled(connection)
+        finally:
+            readers.put_nowait(connection)
+
+    # Внутри writer() нельзя вызывать другие функции записи: они ждут ту же задачу,
+    # поэтому вложенный вызов сразу завершается ошибкой
+    @asynccontextmanager
+    async def writer(self):
+        self._ensure_started()
+        outer = _current_write.get()
+        if outer is not None and not outer.released.done():
+            raise RuntimeError("Nested db_pool.writer() call would deadlock the writer task")
+        request = _WriteRequest(asyncio.get_running_loop())
+        self._write_queue.put_nowait(request)
+        try:
+            connection = await request.granted
+        except BaseException as e:
+            # Отмена пришла уже после выдачи соединения - отпускаем его
+            if request.granted.done() and not request.granted.cancelled():
+                request.released.set_result(e)
+            raise
+        token = _current_write.set(request)
+        try:
+            yield profiled(connection)
+        except BaseException as e:
+            request.released.set_result(e)
+            raise
+        finally:
+            _current_write.reset(token)
+        request.released.set_result(None)
+        await request.committed
+
+    async def _writer_loop(self):
+        while True:
+            request = await self._write_queue.get()
+            try:
+                await self._run_batch(request)
+            except Exception as e:
+                db_logger.error("Unexpected error in database writer task: %s", e, exc_info=True)
+
+    def _next_request(self) -> Optional[_WriteRequest]:
+        try:
+            return self._write_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def _run_batch(self, request: _WriteRequest):
+        db = self._writer
+        applied: List[_WriteRequest] = []
+        processed = 0
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            while request is not None:
+                if await self._run_request(db, request):
+                    applied.append(request)
+                processed += 1
+                if processed >= self.batch_size:
+                    break
+                request = self._next_request()
+                if request is None and processed > 1:
+                    # Под нагрузкой даем шанс запросам, пришедшим чуть позже, попасть в ту же
+                    # транзакцию; одиночная запись коммитится сразу
+                    await asyncio.sleep(self.batch_window)
+                    request = self._next_request()
+            await db.execute("COMMIT")
+        except BaseException as e:
+            if db.in_transaction:
+                await db.execute("ROLLBACK")
+            error = e if isinstance(e, Exception) else RuntimeError("Write batch was interrupted")
+            # Текущий запрос мог уже получить соединение, но еще не попасть в applied
+            if request is not None:
+                request.fail(error)
+            for applied_request in applied:
+                applied_request.fail(error)
+            raise
+        for applied_request in applied:
+            if not applied_request.committed.done():
+                applied_request.committed.set_result(None)
+
+    async def _run_request(self, db: aiosqlite.Connection, request: _WriteRequest) -> bool:
+        # Вызывающий код мог быть отменен, пока ждал своей очереди
+        if request.granted.done():
+            return False
+        await db.execute("SAVEPOINT write_request")
+        request.granted.set_result(db)
+        error = await request.released
+        if error is None:
+            await db.execute("RELEASE write_request")
+            return True
+        await db.execute("ROLLBACK TO write_request")
+        await db.execute("RELEASE write_request")
+        return False
+
+
+db_pool = ConnectionPool(
+    readers=config.db_readers,
+    journal_mode=config.db_journal_mode,
+    synchronous=config.db_synchronous,
+    busy_timeout_ms=config.db_busy_timeout_ms,
+    cache_size_kib=config.db_cache_size_kib,
+    mmap_size=config.db_mmap_size,
+    batch_window=config.db_write_batch_ms / 1000,
+    batch_size=config.db_write_batch_size,
+)
@@ -0,0 +1,214 @@
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from app.utils.logger import profiler_logger
+
+# Профиль обновления, которое сейчас обрабатывается в этой задаче. Пока профиля нет,
+# пул выдает соединения как есть и профилирование ничего не стоит
+current_profile: ContextVar[Optional["UpdateProfile"]] = ContextVar('current_profile', default=None)
+
+# Модули, через которые проходит вызов запроса и которые не интересны в отчете
+SKIPPED_MODULES = {__name__, 'aiosqlite.context', 'aiosqlite.core', 'aiosqlite.cursor', 'contextlib',
+                   'app.services.db_pool', 'app.services.metrics'}
+
+
+def _caller() -> str:
+    # Первая функция приложения выше по стеку - та, что выполняет запрос
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module not in SKIPPED_MODULES:
+            return f"{module.removeprefix('app.')}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+
+def _params_shape(parameters: Any) -> str:
+    if not parameters:
+        return '()'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+class QueryRecord:
+    __slots__ = ('sql', 'parameters', 'shape', 'caller', 'duration_ms', 'rows')
+
+    def __init__(self, sql: str, parameters: Any, shape: str, caller: str):
+        self.sql = ' '.join(sql.split())
+        self.parameters = parameters
+        self.shape = shape
+        self.caller = caller
+        self.duration_ms = 0.0
+        self.rows = 0
+
+    @property
+    def identity(self) -> Tuple[str, str]:
+        return self.sql, repr(self.parameters)
+
+
+class UpdateProfile:
+    def __init__(self, update_id: int):
+        self.update_id = update_id
+        self.started_at = time.perf_counter()
+        self.queries: List[QueryRecord] = []
+
+    def record(self, sql: str, parameters: Any, shape: Optional[str] = None) -> QueryRecord:
+        query = QueryRecord(sql, parameters, shape or _params_shape(parameters), _caller())
+        self.queries.append(query)
+        return query
+
+    def report(self, slow_ms: float) -> Tuple[str, bool]:
+        # Текст отчета и признак, что в нем есть повторы или медленные запросы
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        db_ms = sum(query.duration_ms for query in self.queries)
+        lines = [f"Update {self.update_id}: {len(self.queries)} queries, {db_ms:.2f} ms in DB "
+                 f"of {total_ms:.2f} ms, {sum(query.rows for query in self.queries)} rows"]
+        for number, query in enumerate(self.queries, 1):
+            lines.append(f"  {number}. {query.duration_ms:.2f} ms, rows={query.rows}, {query.caller}: "
+                         f"{query.sql} {query.shape}")
+
+        identical = Counter(query.identity for query in self.queries)
+        statements = Counter(query.sql for query in self.queries)
+        callers: Dict[str, List[str]] = {}
+        for query in self.queries:
+            callers.setdefault(query.sql, []).append(query.caller)
+        problems = False
+        for (sql, parameters), count in identical.items():
+            if count > 1:
+                problems = True
+                lines.append(f"  REPEATED x{count} with the same parameters {parameters}: {sql} "
+                             f"({', '.join(sorted(set(callers[sql])))})")
+        for sql, count in statements.items():
+            distinct = len({query.identity for query in self.queries if query.sql == sql})
+            if count > 1 and distinct > 1:
+                problems = True
+                lines.append(f"  N+1 candidate x{count} ({distinct} parameter sets): {sql} "
+                             f"({', '.join(sorted(set(callers[sql])))})")
+        for query in self.queries:
+            if query.duration_ms >= slow_ms:
+                problems = True
+                lines.append(f"  SLOW {query.duration_ms:.2f} ms ({query.caller}): {query.sql}")
+        return '\n'.join(lines), problems
+
+    def log_report(self, slow_ms: float):
+        if not self.queries:
+            return
+        report, problems = self.report(slow_ms)
+        if problems:
+            profiler_logger.warning("%s", report)
+        else:
+            profiler_logger.info("%s", report)
+
+
+class _QueryResult:
+    # Как aiosqlite.context.Result: запрос можно дождаться через await или открыть в async with
+    __slots__ = ('_coro', '_cursor')
+
+    def __init__(self, coro):
+        self._coro = coro
+        self._cursor = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._coro
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+
+class ProfiledCursor:
+    # Добавляет к записи запроса время выборки и число прочитанных строк
+    def __init__(self, cursor: aiosqlite.Cursor, query: QueryRecord):
+        self._cursor = cursor
+        self._query = query
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    async def _timed(self, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._query.duration_ms += (time.perf_counter() - started) * 1000
+
+    async def fetchone(self):
+        row = await self._timed(self._cursor.fetchone())
+        if row is not None:
+            self._query.rows += 1
+        return row
+
+    async def fetchmany(self, size: Optional[int] = None):
+        rows = await self._timed(self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+        self._query.rows += len(rows)
+        return rows
+
+    async def fetchall(self):
+        rows = await self._timed(self._cursor.fetchall())
+        self._query.rows += len(rows)
+        return rows
+
+    async def __aiter__(self):
+        while True:
+            rows = await self.fetchmany(self._cursor.arraysize)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+    async def close(self):
+        await self._cursor.close()
+
+
+class ProfiledConnection:
+    # Обертка соединения пула, которая записывает каждый запрос в профиль обновления
+    def __init__(self, connection: aiosqlite.Connection, profile: UpdateProfile):
+        self._connection = connection
+        self._profile = profile
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    async def _execute(self, sql: str, parameters: Any = None) -> ProfiledCursor:
+        query = self._profile.record(sql, parameters)
+        started = time.perf_counter()
+        try:
+            cursor = await self._connection.execute(sql, parameters)
+        finally:
+            query.duration_ms += (time.perf_counter() - started) * 1000
+        if cursor.rowcount > 0:
+            query.rows = cursor.rowcount
+        return ProfiledCursor(cursor, query)
+
+    def execute(self, sql: str, parameters: Any = None) -> _QueryResult:
+        return _QueryResult(self._execute(sql, parameters))
+
+    async def _executemany(self, sql: str, parameters: Any) -> ProfiledCursor:
+        parameters = list(parameters)
+        shape = f"{len(parameters)} x {_params_shape(parameters[0]) if parameters else '()'}"
+        query = self._profile.record(sql, parameters, shape)
+        started = time.perf_counter()
+        try:
+            cursor = await self._connection.executemany(sql, parameters)
+        finally:
+            query.duration_ms += (time.perf_counter() - started) * 1000
+        if cursor.rowcount > 0:
+            query.rows = cursor.rowcount
+        return ProfiledCursor(cursor, query)
+
+    def executemany(self, sql: str, parameters: Any) -> _QueryResult:
+        return _QueryResult(self._executemany(sql, parameters))
+
+
+def profiled(connection: aiosqlite.Connection):
+    profile = current_profile.get()
+    return connection if profile is None else ProfiledConnection(connection, profile)
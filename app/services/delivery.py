@@ -0,0 +1,95 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+
+from app.config_reader import config
+from app.services.broadcast import Broadcaster, OutgoingMessage, broadcaster
+from app.utils.logger import notification_logger
+from app.utils.message_cleaner import message_cleaner
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+# Фоновая очередь уведомлений. Хендлеры только ставят текст в очередь,
+# а отправка идет отдельной задачей: уведомления одному получателю,
+# накопившиеся за merge_window, объединяются в одно сообщение
+class DeliveryQueue:
+    def __init__(self, broadcaster: Broadcaster, merge_window: float = 2):
+        self.broadcaster = broadcaster
+        self.merge_window = merge_window
+        self._pending: Dict[int, List[str]] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, bot: Bot):
+        if self._task is not None:
+            return
+        self._bot = bot
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        # Не отменяем задачу: начатая отправка пачки должна дойти до всех получателей
+        self._stopping.set()
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        # Отправляем то, что успели поставить в очередь
+        await self.flush()
+
+    def enqueue(self, chat_id: int, text: str):
+        texts = self._pending.setdefault(chat_id, [])
+        if text not in texts:
+            texts.append(text)
+        self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            await self._wakeup.wait()
+            # Ждем merge_window, но при остановке отправляем сразу
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.merge_window)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                notification_logger.error("Error delivering queued notifications: %s", e, exc_info=True)
+
+    async def flush(self):
+        if not self._pending or self._bot is None:
+            return
+        pending, self._pending = self._pending, {}
+        messages = [OutgoingMessage(chat_id, text)
+                    for chat_id, texts in pending.items()
+                    for text in merge_texts(texts)]
+        result = await self.broadcaster.send(self._bot, messages)
+        for response in result.sent_messages:
+            await message_cleaner.add_message_to_delete(response.chat.id, response)
+        notification_logger.info("Delivered queued notifications to %s recipients. "
+                                 "Delivered: %s, failed: %s", len(pending), result.delivered, result.failed)
+
+
+def merge_texts(texts: List[str]) -> List[str]:
+    merged = []
+    current = ""
+    for text in texts:
+        candidate = f"{current}\n\n{text}" if current else text
+        if len(candidate) <= MAX_MESSAGE_LENGTH:
+            current = candidate
+            continue
+        if current:
+            merged.append(current)
+        current = text[:MAX_MESSAGE_LENGTH]
+    if current:
+        merged.append(current)
+    return merged
+
+
+delivery_queue = DeliveryQueue(broadcaster, merge_window=config.delivery_merge_window)
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from app.config_reader import config
+from app.services.db_pool import db_pool
+from app.utils.logger import db_logger
+
+
+class _StateRecord:
+    __slots__ = ('state', 'data', 'updated_at')
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None, updated_at: float = 0):
+        self.state = state
+        self.data = data or {}
+        self.updated_at = updated_at
+
+    @property
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+# FSM-хранилище в той же базе SQLite. Чтение идет через LRU-кэш в памяти,
+# изменения копятся и записываются пачкой раз в flush_interval секунд.
+# Незавершенные сценарии старше ttl считаются брошенными и удаляются
+class SQLiteStorage(BaseStorage):
+    def __init__(self, max_cached: int = 10000, flush_interval: float = 1, ttl: float = 24 * 3600):
+        self.max_cached = max_cached
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+        self._cache: "OrderedDict[str, _StateRecord]" = OrderedDict()
+        self._dirty: Dict[str, _StateRecord] = {}
+        # Изменения, которые сейчас записываются в базу
+        self._flushing: Dict[str, _StateRecord] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flush_task is None:
+            return
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+        await self.flush()
+
+    def _is_expired(self, record: _StateRecord) -> bool:
+        return not record.is_empty and record.updated_at < time.time() - self.ttl
+
+    def _remember(self, key: str, record: _StateRecord):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        # Вытесняем самые старые записи; несохраненные изменения остаются в self._dirty
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def _cached(self, storage_key: str) -> Optional[_StateRecord]:
+        return self._cache.get(storage_key) or self._dirty.get(storage_key) or self._flushing.get(storage_key)
+
+    async def _get_record(self, key: StorageKey) -> _StateRecord:
+        storage_key = self.key_builder.build(key)
+        record = self._cached(storage_key)
+        if record is None:
+            loaded = await self._load(storage_key)
+            # Пока шло чтение, другое обновление могло создать или изменить запись:
+            # она новее прочитанной из базы
+            record = self._cached(storage_key) or loaded
+        if self._is_expired(record):
+            record = _StateRecord(updated_at=time.time())
+            self._dirty[storage_key] = record
+        self._remember(storage_key, record)
+        return record
+
+    async def _load(self, storage_key: str) -> _StateRecord:
+        async with db_pool.reader() as db:
+            async with db.execute("SELECT state, data, updated_at FROM fsm_states WHERE key = ?",
+                                  (storage_key,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return _StateRecord()
+        return _StateRecord(row['state'], json.loads(row['data']) if row['data'] else {}, row['updated_at'])
+
+    async def _update(self, key: StorageKey, **fields):
+        storage_key = self.key_builder.build(key)
+        record = await self._get_record(key)
+        for name, value in fields.items():
+            setattr(record, name, value)
+        record.updated_at = time.time()
+        self._dirty[storage_key] = record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._update(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._update(key, data=data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.time() - self._last_purge > min(self.ttl, 3600):
+                    await self.purge_expired()
+            except Exception as e:
+                db_logger.error("Error flushing FSM storage: %s", e, exc_info=True)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        self._flushing = dirty
+        upserts = []
+        deletes = []
+        for storage_key, record in dirty.items():
+            if record.is_empty:
+                deletes.append((storage_key,))
+            else:
+                upserts.append((storage_key, record.state, json.dumps(record.data, ensure_ascii=False),
+                                int(record.updated_at)))
+        try:
+            async with db_pool.writer() as db:
+                if deletes:
+                    await db.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+                if upserts:
+                    await db.executemany(
+                        "INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                        upserts)
+        except Exception:
+            # Возвращаем изменения в очередь, если за это время их не перезаписали
+            for storage_key, record in dirty.items():
+                self._dirty.setdefault(storage_key, record)
+            raise
+        finally:
+            self._flushing = {}
+
+    async def purge_expired(self):
+        self._last_purge = time.time()
+        expired_before = int(time.time() - self.ttl)
+        async with db_pool.writer() as db:
+            cursor = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (expired_before,))
+            purged = cursor.rowcount
+        for storage_key in [key for key, record in self._cache.items() if self._is_expired(record)]:
+            del self._cache[storage_key]
+        if purged:
+            db_logger.info("Purged %s expired FSM states", purged)
+
+
+fsm_storage = SQLiteStorage(
+    max_cached=config.fsm_cache_size,
+    flush_interval=config.fsm_flush_interval,
+    ttl=config.fsm_ttl_hours * 3600,
+)
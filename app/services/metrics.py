@@ -0,0 +1,237 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+
+from app.config_reader import config
+from app.utils.logger import main_logger
+
+# Границы корзин гистограмм в секундах, как у клиентов Prometheus по умолчанию
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Метрики обновляются только из event loop, поэтому обходятся без блокировок
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Для каждого набора меток: число попаданий в каждую корзину (не накопительно), сумма, количество
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        # Текстовый формат экспозиции Prometheus
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+handler_duration = metrics.histogram(
+    'bot_handler_duration_seconds', 'Time spent in update handlers',
+    ('router', 'handler', 'prefix'))
+handler_errors = metrics.counter(
+    'bot_handler_errors_total', 'Exceptions raised by update handlers',
+    ('router', 'handler', 'prefix', 'error'))
+db_duration = metrics.histogram(
+    'bot_db_function_duration_seconds', 'Time spent in app.services.database functions',
+    ('function',))
+db_errors = metrics.counter(
+    'bot_db_function_errors_total', 'Exceptions raised by app.services.database functions',
+    ('function', 'error'))
+api_requests = metrics.counter(
+    'bot_api_requests_total', 'Bot API requests by method and result',
+    ('method', 'status'))
+api_duration = metrics.histogram(
+    'bot_api_request_duration_seconds', 'Bot API request time',
+    ('method',))
+callback_duplicates = metrics.counter(
+    'bot_callback_duplicates_total', 'Repeated button presses answered without running the handler',
+    ('prefix', 'kind'))
+blocked_users_lookups = metrics.counter(
+    'bot_blocked_users_lookups_total', 'Blocked-user checks served from memory (hit) or needing a load (miss)',
+    ('result',))
+blocked_users_reloads = metrics.counter(
+    'bot_blocked_users_reloads_total', 'Loads of the blocked-user set from the database')
+blocked_users_size = metrics.gauge(
+    'bot_blocked_users', 'Blocked user IDs held in memory')
+reminder_cycle_duration = metrics.histogram(
+    'bot_reminder_cycle_duration_seconds', 'Time to send reminders for one session',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+
+
+def timed_function(func: Callable, histogram: Histogram, errors: Counter) -> Callable:
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+def instrument_module(namespace: Dict[str, Any]):
+    # Заменяет в пространстве имен модуля все его async-функции обертками с замером времени.
+    # Вызывается в конце модуля, до того как другие модули импортируют его функции
+    module_name = namespace['__name__']
+    for name, value in list(namespace.items()):
+        if inspect.iscoroutinefunction(value) and value.__module__ == module_name:
+            namespace[name] = timed_function(value, db_duration, db_errors)
+
+
+# Middleware сессии бота: считает запросы к Bot API по методу и результату
+class BotRequestMetrics(BaseRequestMiddleware):
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        method_name = type(method).__name__
+        status = 'ok'
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            api_duration.observe(time.perf_counter() - started, method_name)
+            api_requests.inc(method_name, status)
+
+
+# Локальный HTTP-сервер, который отдает метрики по /metrics
+class MetricsServer:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        main_logger.info("Metrics endpoint listening on http://%s:%s/metrics", self.host, self.port)
+
+    async def close(self):
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode('utf-8'),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+metrics_server = MetricsServer(config.metrics_host, config.metrics_port)
@@ -1,39 +1,62 @@
+import asyncio
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from app.services.database import get_upcoming_sessions
+from app.services.database import load_session_snapshots, mark_reminders_sent
+from app.services.broadcast import broadcaster, OutgoingMessage
+from app.services.session_snapshot import SessionSnapshot
+from app.keyboards.registry import keyboards
 from app.utils.logger import notification_logger
 from app.utils.message_cleaner import message_cleaner
 
-async def send_session_reminders(bot: Bot):
-    notification_logger.info("Starting to send session reminders")
+
+@keyboards.register("reminder")
+def get_reminder_keyboard(session_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="Подтвердить", callback_data=f"confirm_{session_id}"),
+            InlineKeyboardButton(text="Отклонить", callback_data=f"decline_{session_id}")
+        ]
+    ])
+
+
+def build_reminder(session: SessionSnapshot, user_id: int) -> OutgoingMessage:
+    keyboard = get_reminder_keyboard(session.id)
+    message = (f"Напоминание о предстоящей сессии:\n"
+               f"Игра: {session.game}\n"
+               f"Дата: {session.date}\n"
+               f"Время: {session.time}\n"
+               f"Подтвердите ваше участие:")
+    return OutgoingMessage(user_id, message, keyboard)
+
+
+async def delete_previous_messages_for(bot: Bot, user_ids):
+    semaphore = asyncio.Semaphore(broadcaster.concurrency)
+
+    async def clean(user_id: int):
+        async with semaphore:
+            await message_cleaner.delete_previous_messages(bot, user_id)
+
+    await asyncio.gather(*(clean(user_id) for user_id in set(user_ids)))
+
+
+async def send_session_reminder(bot: Bot, session_id: int):
+    notification_logger.info("Sending reminders for session %s", session_id)
     try:
-        upcoming_sessions = await get_upcoming_sessions()
-        notification_logger.info(f"Found {len(upcoming_sessions)} upcoming sessions for reminders")
-
-        for session in upcoming_sessions:
-            await message_cleaner.delete_previous_messages(bot, session['user_id'])
-
-        for session in upcoming_sessions:
-            try:
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [
-                        InlineKeyboardButton(text="Подтвердить", callback_data=f"confirm_{session['id']}"),
-                        InlineKeyboardButton(text="Отклонить", callback_data=f"decline_{session['id']}")
-                    ]
-                ])
-                message = (f"Напоминание о предстоящей сессии:\n"
-                           f"Игра: {session['game']}\n"
-                           f"Дата: {session['date']}\n"
-                           f"Время: {session['time']}\n"
-                           f"Подтвердите ваше участие:")
-                response = await bot.send_message(session['user_id'], message, reply_markup=keyboard)
-                await message_cleaner.add_message_to_delete(session['user_id'], response)
-                notification_logger.info(f"Reminder sent for session {session['id']} to user {session['user_id']}")
-            except Exception as e:
-                notification_logger.error(
-                    f"Error sending reminder for session {session['id']} to user {session['user_id']}: {str(e)}",
-                    exc_info=True)
-
-        notification_logger.info("Finished sending session reminders")
+        # Снимок читаем мимо кэша: статусы и отметки о напоминаниях должны быть свежими
+        session = (await load_session_snapshots([session_id])).get(session_id)
+        recipients = session.reminder_recipients() if session is not None else ()
+        if not recipients:
+            notification_logger.info("No pending participants to remind for session %s", session_id)
+            return
+
+        await delete_previous_messages_for(bot, [recipient.id for recipient in recipients])
+
+        result = await broadcaster.send(bot, [build_reminder(session, recipient.id) for recipient in recipients])
+        for response in result.sent_messages:
+            await message_cleaner.add_message_to_delete(response.chat.id, response)
+        await mark_reminders_sent(session_id, [response.chat.id for response in result.sent_messages])
+
+        notification_logger.info("Finished sending reminders for session %s. "
+                                 "Delivered: %s, failed: %s", session_id, result.delivered, result.failed)
     except Exception as e:
-        notification_logger.error(f"Error in send_session_reminders: {str(e)}", exc_info=True)
\ No newline at end of file
+        notification_logger.error("Error in send_session_reminder for session %s: %s", session_id, e, exc_info=True)
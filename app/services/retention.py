@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Optional
+
+from app.config_reader import config
+from app.services.database import archive_finished_sessions, archive_orphan_events, incremental_vacuum
+from app.utils.logger import db_logger
+
+
+# Периодическая очистка: завершившиеся сессии и их события уезжают в архивные таблицы,
+# освободившиеся страницы возвращаются файлу через incremental_vacuum.
+# Перенос идет порциями, чтобы не держать транзакцию записи долго
+class RetentionJob:
+    def __init__(self, interval: float, archive_after: float, batch_size: int = 500, vacuum_pages: int = 1000):
+        self.interval = interval
+        self.archive_after = archive_after
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self):
+        finished_before = int(time.time() - self.archive_after)
+        sessions = events = 0
+        while True:
+            archived = await archive_finished_sessions(finished_before, self.batch_size)
+            sessions += archived
+            if archived < self.batch_size:
+                break
+        while True:
+            archived = await archive_orphan_events(self.batch_size)
+            events += archived
+            if archived < self.batch_size:
+                break
+        released = await incremental_vacuum(self.vacuum_pages)
+        db_logger.info("Retention run finished. Sessions archived: %s, orphan events archived: %s, "
+                       "pages released: %s", sessions, events, released)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                db_logger.error("Error in retention job: %s", e, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+retention_job = RetentionJob(
+    interval=config.retention_interval_hours * 3600,
+    archive_after=config.archive_after_days * 86400,
+    batch_size=config.retention_batch_size,
+    vacuum_pages=config.vacuum_pages,
+)
@@ -0,0 +1,96 @@
+import asyncio
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+
+from app.config_reader import config
+from app.services.database import get_future_session_starts
+from app.services.metrics import reminder_cycle_duration
+from app.services.notifications import send_session_reminder
+from app.utils.logger import notification_logger
+
+
+# Планировщик напоминаний: куча моментов отправки по сессиям.
+# Задача спит ровно до ближайшего напоминания и просыпается раньше,
+# только если расписание изменилось (создание/удаление сессии, новый участник)
+class ReminderScheduler:
+    def __init__(self, remind_before: float):
+        self.remind_before = remind_before
+        self._heap: List[Tuple[float, int]] = []
+        self._starts_at: Dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, bot: Bot):
+        if self._task is not None:
+            return
+        self._bot = bot
+        for session in await get_future_session_starts():
+            self.schedule(session['id'], session['starts_at'])
+        notification_logger.info("Reminder scheduler started with %s sessions", len(self._starts_at))
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def schedule(self, session_id: int, starts_at: int):
+        if starts_at <= time.time():
+            return
+        self._starts_at[session_id] = starts_at
+        heapq.heappush(self._heap, (starts_at - self.remind_before, session_id))
+        self._wakeup.set()
+
+    def cancel(self, session_id: int):
+        # Запись в куче удалится лениво, когда до нее дойдет очередь
+        self._starts_at.pop(session_id, None)
+
+    def participants_changed(self, session_id: int):
+        # Если напоминание по сессии уже ушло, новые участники получают его сразу
+        starts_at = self._starts_at.get(session_id)
+        if starts_at is not None and time.time() >= starts_at - self.remind_before:
+            heapq.heappush(self._heap, (time.time(), session_id))
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, session_id = heapq.heappop(self._heap)
+            starts_at = self._starts_at.get(session_id)
+            if starts_at is None:
+                continue
+            if starts_at <= time.time():
+                del self._starts_at[session_id]
+                continue
+            started = time.perf_counter()
+            try:
+                await send_session_reminder(self._bot, session_id)
+            except Exception as e:
+                notification_logger.error("Error sending reminders for session %s: %s", session_id, e, exc_info=True)
+            reminder_cycle_duration.observe(time.perf_counter() - started)
+            self._forget_started()
+
+    def _forget_started(self):
+        now = time.time()
+        for session_id in [session_id for session_id, starts_at in self._starts_at.items() if starts_at <= now]:
+            del self._starts_at[session_id]
+
+
+reminder_scheduler = ReminderScheduler(remind_before=config.reminder_hours_before * 3600)
@@ -0,0 +1,53 @@
+import json
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import aiosqlite
+
+CONFIRMATION_PENDING = "pending"
+
+
+@dataclass(frozen=True, slots=True)
+class Participant:
+    id: int
+    name: str
+    username: Optional[str]
+    # pending, пока участник не подтвердил или не отклонил участие
+    status: str
+    reminded: bool
+
+
+# Сессия вместе с создателем, участниками и их статусами подтверждения.
+# Снимки неизменяемы: один и тот же объект отдается из кэша разным обработчикам
+@dataclass(frozen=True, slots=True)
+class SessionSnapshot:
+    id: int
+    game: str
+    date: str
+    time: str
+    max_players: int
+    creator_id: int
+    creator_name: str
+    starts_at: int
+    participants: Tuple[Participant, ...]
+
+    @classmethod
+    def from_row(cls, row: aiosqlite.Row) -> "SessionSnapshot":
+        # Участники приходят одной колонкой: JSON-массив [id, name, username, status, reminded]
+        participants = tuple(
+            Participant(user_id, name, username, status, bool(reminded))
+            for user_id, name, username, status, reminded in json.loads(row['participants'])
+        )
+        return cls(row['id'], row['game'], row['date'], row['time'], row['max_players'], row['creator_id'],
+                   row['creator_name'], row['starts_at'], participants)
+
+    @property
+    def current_players(self) -> int:
+        return len(self.participants)
+
+    def is_participant(self, user_id: int) -> bool:
+        return any(participant.id == user_id for participant in self.participants)
+
+    def reminder_recipients(self) -> Tuple[Participant, ...]:
+        return tuple(participant for participant in self.participants
+                     if participant.status == CONFIRMATION_PENDING and not participant.reminded)
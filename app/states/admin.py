@@ -5,3 +5,4 @@ class AdminStates(StatesGroup):
     waiting_for_user_id = State()
     waiting_for_user_id_unblock = State()
     waiting_for_block_reason = State()
+    waiting_for_user_search = State()
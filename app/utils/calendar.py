@@ -1,21 +1,34 @@
 from aiogram_calendar import SimpleCalendar as BaseSimpleCalendar
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
+
+from app.keyboards.registry import keyboards
 
 
 class CustomSimpleCalendar(BaseSimpleCalendar):
     async def start_calendar(
             self,
-            year: int = datetime.now().year,
-            month: int = datetime.now().month
+            year: Optional[int] = None,
+            month: Optional[int] = None
     ) -> InlineKeyboardMarkup:
+        now = datetime.now()
+        # Календарь подсвечивает сегодняшний день, поэтому он входит в ключ кэша
+        return await self._build_calendar(year or now.year, month or now.month, now.date())
+
+    @keyboards.register("calendar")
+    async def _build_calendar(self, year: int, month: int, today: date) -> InlineKeyboardMarkup:
         markup = await super().start_calendar(year, month)
 
         # Заменяем кнопку "Cancel" на "Отмена"
-        for row in markup.inline_keyboard:
-            for button in row:
-                if button.text == "Cancel":
-                    button.text = "Отмена"
-                    button.callback_data = "cancel_session_creation"
+        return markup.model_copy(update={"inline_keyboard": [
+            [
+                button.model_copy(update={"text": "Отмена", "callback_data": "cancel_session_creation"})
+                if button.text == "Cancel" else button
+                for button in row
+            ]
+            for row in markup.inline_keyboard
+        ]})
+
 
-        return markup
\ No newline at end of file
+session_calendar = CustomSimpleCalendar()
@@ -1,33 +1,128 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
 
+from app.config_reader import config
 
-def setup_logger(name, log_file, level=logging.INFO):
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
+# Обновление, которое сейчас обрабатывается в этой задаче (выставляет UpdateContextMiddleware)
+current_update_id: ContextVar[Optional[int]] = ContextVar('current_update_id', default=None)
+update_started_at: ContextVar[Optional[float]] = ContextVar('update_started_at', default=None)
+
+
+class UpdateContextFilter(logging.Filter):
+    # Контекст обновления живет только в задаче event loop, поэтому копируем его
+    # в запись до того, как она уйдет в очередь
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = current_update_id.get()
+        started_at = update_started_at.get()
+        record.latency_ms = round((time.perf_counter() - started_at) * 1000, 2) if started_at is not None else None
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    # Стандартный QueueHandler собирает текст сообщения (msg % args, трассировку) еще в event loop.
+    # Очередь живет в том же процессе, поэтому запись передаем как есть, а форматирует ее
+    # поток QueueListener. Аргументы логов после вызова не изменяются
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "update_id": getattr(record, 'update_id', None),
+            "latency_ms": getattr(record, 'latency_ms', None),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _rotating_handler(log_file: str) -> RotatingFileHandler:
     # Ensure the log directory exists
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    return RotatingFileHandler(log_file, maxBytes=config.log_max_bytes, backupCount=config.log_backup_count,
+                               encoding='utf-8')
+
+
+def _build_handlers() -> List[logging.Handler]:
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = _rotating_handler(config.log_file)
+    file_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [file_handler]
+    if config.log_console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    if config.log_json:
+        json_handler = _rotating_handler(config.log_json_file)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+    return handlers
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging():
+    # Все логгеры пишут через один QueueHandler на корневом логгере, а в файл и консоль
+    # записи выводит единственный поток QueueListener: event loop не ждет диск,
+    # и файл ротирует только один обработчик
+    global _listener
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    root.setLevel(config.log_level.upper())
+    handler = LazyQueueHandler(_log_queue)
+    handler.addFilter(UpdateContextFilter())
+    root.addHandler(handler)
+    for name, level in config.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(_log_queue, *_build_handlers(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
-    handler = RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5)
-    handler.setFormatter(formatter)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(handler)
+def shutdown_logging():
+    # Дописывает оставшиеся в очереди записи и останавливает поток записи
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
 
-    return logger
 
+setup_logging()
 
 # Setup loggers
-main_logger = setup_logger('main', 'logs/main.log')
-db_logger = setup_logger('database', 'logs/main.log')
-admin_logger = setup_logger('admin', 'logs/main.log')
-session_logger = setup_logger('session', 'logs/main.log')
-help_logger = setup_logger('help', 'logs/main.log')
-registration_logger = setup_logger('registration', 'logs/main.log')
-start_logger = setup_logger('start', 'logs/main.log')
-menu_logger = setup_logger('menu', 'logs/main.log')
-notification_logger = setup_logger('notification', 'logs/main.log')
-profile_logger = setup_logger('profile', 'logs/main.log')
-common_logger = setup_logger('common', 'logs/main.log')
\ No newline at end of file
+main_logger = logging.getLogger('main')
+db_logger = logging.getLogger('database')
+admin_logger = logging.getLogger('admin')
+session_logger = logging.getLogger('session')
+help_logger = logging.getLogger('help')
+registration_logger = logging.getLogger('registration')
+start_logger = logging.getLogger('start')
+menu_logger = logging.getLogger('menu')
+notification_logger = logging.getLogger('notification')
+profile_logger = logging.getLogger('profile')
+common_logger = logging.getLogger('common')
+middleware_logger = logging.getLogger('middleware')
+cleaner_logger = logging.getLogger('cleaner')
+update_logger = logging.getLogger('update')
+profiler_logger = logging.getLogger('profiler')
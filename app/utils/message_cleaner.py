@@ -1,30 +1,158 @@
+import asyncio
+import time
+from collections import OrderedDict
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import Message
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from app.config_reader import config
+from app.services.db_pool import db_pool
+from app.utils.logger import cleaner_logger
+
+# Telegram позволяет удалить до 100 сообщений за раз и только не старше 48 часов
+DELETE_BATCH_SIZE = 100
+MESSAGE_MAX_AGE = 48 * 3600
+
 
 class MessageCleaner:
-    def __init__(self):
+    def __init__(self, max_per_user: int = 50, max_total: int = 10000, flush_interval: float = 1):
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.flush_interval = flush_interval
         self.message_ids: Dict[int, List[Tuple[int, int]]] = {}
+        # Порядок добавления всех сообщений для вытеснения самых старых
+        self._order: "OrderedDict[Tuple[int, int, int], float]" = OrderedDict()
+        # Изменения, которые еще не записаны в базу, в порядке их появления
+        self._pending: List[Tuple[str, tuple]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._flush_task is not None:
+            return
+        await self.load()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task is None:
+            return
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+        await self.flush()
+
+    async def load(self):
+        expired_before = time.time() - MESSAGE_MAX_AGE
+        async with db_pool.writer() as db:
+            await db.execute("DELETE FROM cleanup_messages WHERE created_at < ?", (int(expired_before),))
+        async with db_pool.reader() as db:
+            async with db.execute("""
+                SELECT user_id, chat_id, message_id, created_at
+                FROM cleanup_messages
+                ORDER BY created_at, rowid
+            """) as cursor:
+                async for row in cursor:
+                    self._remember(row['user_id'], row['chat_id'], row['message_id'], row['created_at'],
+                                   persist=False)
+        cleaner_logger.info("Loaded %s messages to delete for %s users", len(self._order), len(self.message_ids))
+
+    def _remember(self, user_id: int, chat_id: int, message_id: int, created_at: float, persist: bool = True):
+        key = (user_id, chat_id, message_id)
+        if key in self._order:
+            return
+        self.message_ids.setdefault(user_id, []).append((chat_id, message_id))
+        self._order[key] = created_at
+        if persist:
+            self._pending.append(("insert", (user_id, chat_id, message_id, int(created_at))))
+
+        user_messages = self.message_ids[user_id]
+        while len(user_messages) > self.max_per_user:
+            self._forget(user_id, *user_messages[0])
+        while len(self._order) > self.max_total:
+            self._forget(*next(iter(self._order)))
+
+    def _forget(self, user_id: int, chat_id: int, message_id: int):
+        self._order.pop((user_id, chat_id, message_id), None)
+        user_messages = self.message_ids.get(user_id)
+        if user_messages is not None:
+            user_messages.remove((chat_id, message_id))
+            if not user_messages:
+                del self.message_ids[user_id]
+        self._pending.append(("delete", (user_id, chat_id, message_id)))
 
     async def add_message_to_delete(self, user_id: int, message: Message):
-        if user_id not in self.message_ids:
-            self.message_ids[user_id] = []
-        self.message_ids[user_id].append((message.chat.id, message.message_id))
+        self._remember(user_id, message.chat.id, message.message_id, time.time())
 
     async def delete_previous_messages(self, bot: Bot, user_id: int):
-        if user_id in self.message_ids:
-            for chat_id, msg_id in self.message_ids[user_id]:
-                try:
-                    await bot.delete_message(chat_id=chat_id, message_id=msg_id)
-                except Exception as e:
-                    print(f"Error deleting message {msg_id}: {e}")
-            self.message_ids[user_id] = []
+        user_messages = self.message_ids.pop(user_id, None)
+        if not user_messages:
+            return
+        by_chat: Dict[int, List[int]] = {}
+        for chat_id, msg_id in user_messages:
+            self._order.pop((user_id, chat_id, msg_id), None)
+            by_chat.setdefault(chat_id, []).append(msg_id)
+        self._pending.append(("delete_user", (user_id,)))
+
+        await asyncio.gather(*(
+            self._delete_batch(bot, chat_id, msg_ids[i:i + DELETE_BATCH_SIZE])
+            for chat_id, msg_ids in by_chat.items()
+            for i in range(0, len(msg_ids), DELETE_BATCH_SIZE)
+        ))
+
+    async def _delete_batch(self, bot: Bot, chat_id: int, msg_ids: List[int]):
+        # Лимиты Telegram на отправку к удалению не относятся: ждем только по RetryAfter
+        for attempt in range(2):
+            try:
+                if len(msg_ids) == 1:
+                    await bot.delete_message(chat_id=chat_id, message_id=msg_ids[0])
+                else:
+                    await bot.delete_messages(chat_id=chat_id, message_ids=msg_ids)
+                return
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                cleaner_logger.warning("Error deleting messages %s in chat %s: %s", msg_ids, chat_id, e)
+                return
 
     async def add_user_message(self, message: Message):
-        user_id = message.from_user.id
-        if user_id not in self.message_ids:
-            self.message_ids[user_id] = []
-        self.message_ids[user_id].append((message.chat.id, message.message_id))
+        await self.add_message_to_delete(message.from_user.id, message)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                cleaner_logger.error("Error saving messages to delete: %s", e, exc_info=True)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            async with db_pool.writer() as db:
+                for operation, params in pending:
+                    if operation == "insert":
+                        await db.execute("""
+                            INSERT OR IGNORE INTO cleanup_messages (user_id, chat_id, message_id, created_at)
+                            VALUES (?, ?, ?, ?)
+                        """, params)
+                    elif operation == "delete":
+                        await db.execute(
+                            "DELETE FROM cleanup_messages WHERE user_id = ? AND chat_id = ? AND message_id = ?",
+                            params)
+                    else:
+                        await db.execute("DELETE FROM cleanup_messages WHERE user_id = ?", params)
+        except Exception:
+            self._pending[:0] = pending
+            raise
 
-message_cleaner = MessageCleaner()
 
+message_cleaner = MessageCleaner(
+    max_per_user=config.cleaner_max_per_user,
+    max_total=config.cleaner_max_total,
+    flush_interval=config.cleaner_flush_interval,
+)
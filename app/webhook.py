@@ -0,0 +1,59 @@
+import asyncio
+import secrets
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.utils.logger import main_logger
+
+
+# Обработчик вебхука с ограничением числа одновременно обрабатываемых обновлений.
+# Пока все обработчики заняты, ответ Telegram задерживается - он сам притормозит доставку
+class BoundedRequestHandler(SimpleRequestHandler):
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int, secret_token: Optional[str] = None,
+                 **data: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token,
+                         **data)
+        self._workers = asyncio.Semaphore(workers)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        await self._workers.acquire()
+        task = asyncio.create_task(self._feed_update(bot, update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _feed_update(self, bot: Bot, update: Dict[str, Any]):
+        try:
+            await self._background_feed_update(bot, update)
+        except Exception as e:
+            main_logger.error("Error processing webhook update %s: %s", update.get('update_id'), e, exc_info=True)
+        finally:
+            self._workers.release()
+
+    async def close(self) -> None:
+        # Дожидаемся уже принятых обновлений, потом закрываем сессию бота
+        if self._background_feed_update_tasks:
+            await asyncio.gather(*self._background_feed_update_tasks, return_exceptions=True)
+        await super().close()
+
+
+def create_app(dp: Dispatcher, bot: Bot, path: str = "/webhook", secret_token: Optional[str] = None,
+               workers: int = 1, **data: Any) -> web.Application:
+    # Приложение можно поднять локально и слать в него обновления POST-запросами
+    app = web.Application()
+    BoundedRequestHandler(dp, bot, workers=workers, secret_token=secret_token, **data).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def webhook_secret(configured: Optional[str]) -> str:
+    if configured:
+        return configured
+    # Без заданного секрета генерируем свой: подходит для одного процесса,
+    # для нескольких экземпляров секрет нужно задать в настройках
+    main_logger.warning("Webhook secret is not configured, generating a random one")
+    return secrets.token_urlsafe(32)
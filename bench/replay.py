@@ -0,0 +1,294 @@
+# Нагрузочный прогон бота: синтетические обновления идут через настоящий Dispatcher
+# с теми же роутерами и middleware, что и в app/main.py. Сеть заменена фиктивной
+# сессией бота, база - временный файл SQLite.
+#
+# Запуск из корня репозитория:
+#   python bench/replay.py --users 200 --concurrency 20 --api-latency-ms 30 --json result.json
+#
+# Для каждого этапа (регистрация, создание сессии, список, двойное нажатие, вступление, подтверждение)
+# выводятся p50/p95/p99 времени обработки обновления, обновлений в секунду,
+# SQL-запросов и вызовов Bot API на обновление.
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, get_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Импорты как при запуске app/main.py: корень репозитория и папка app в пути
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'app')]
+os.environ.setdefault('BOT_TOKEN', '42:BENCHMARK')
+os.environ.setdefault('ADMIN_USER_ID', '1')
+# Логи прогона остаются в его временной папке и не засоряют отчет
+os.environ.setdefault('LOG_CONSOLE', 'false')
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message
+
+# Идентификаторы пользователей бенчмарка не пересекаются с админом
+FIRST_USER_ID = 100000
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA')
+
+
+class MockSession(BaseSession):
+    # Вместо запросов к Telegram считает вызовы и возвращает правдоподобные ответы
+    def __init__(self, latency: float = 0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1_000_000)
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message or Message in get_args(returning):
+            chat_id = getattr(method, 'chat_id', None) or 0
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=chat_id, type='private'),
+                text=getattr(method, 'text', None),
+            ).as_(bot)
+        return True
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    updates: int = 0
+    seconds: float = 0
+    latencies_ms: List[float] = field(default_factory=list)
+    db_queries: int = 0
+    api_calls: Dict[str, int] = field(default_factory=dict)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies_ms:
+            return 0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        updates = self.updates or 1
+        return {
+            "phase": self.name,
+            "updates": self.updates,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "updates_per_s": round(self.updates / self.seconds, 1) if self.seconds else 0,
+            "db_queries_per_update": round(self.db_queries / updates, 2),
+            "api_calls_per_update": round(sum(self.api_calls.values()) / updates, 2),
+            "api_calls": dict(sorted(self.api_calls.items(), key=lambda item: -item[1])),
+        }
+
+
+class UpdateFactory:
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": "Bench", "username": f"bench{user_id}",
+                "language_code": "ru"}
+
+    def _message(self, user_id: int, text: Optional[str] = None, message_id: Optional[int] = None) -> Dict[str, Any]:
+        message = {"message_id": message_id or next(self._message_ids), "date": int(time.time()),
+                   "chat": {"id": user_id, "type": "private"}, "from": self._user(user_id)}
+        if text is not None:
+            message["text"] = text
+            if text.startswith('/'):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return message
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        return {"update_id": next(self._update_ids), "message": self._message(user_id, text)}
+
+    def callback(self, user_id: int, data: str, message_id: Optional[int] = None) -> Dict[str, Any]:
+        # message_id задается, когда нужно нажать кнопку того же сообщения еще раз
+        update_id = next(self._update_ids)
+        message = self._message(user_id, "Сообщение с кнопками", message_id)
+        message["from"] = {"id": 42, "is_bot": True, "first_name": "Bot"}
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": self._user(user_id), "chat_instance": str(user_id),
+            "message": message, "data": data}}
+
+
+class Replay:
+    def __init__(self, bot: Bot, dp: Dispatcher, session: MockSession, concurrency: int):
+        self.bot = bot
+        self.dp = dp
+        self.session = session
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.updates = UpdateFactory()
+        self.db_queries = 0
+        self.results: List[PhaseResult] = []
+
+    def trace(self, statement: str):
+        # Служебные выражения транзакций и прагмы не считаем запросами
+        if not statement.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+            self.db_queries += 1
+
+    async def _feed(self, phase: PhaseResult, update: Dict[str, Any]):
+        started = time.perf_counter()
+        await self.dp.feed_raw_update(self.bot, update)
+        phase.latencies_ms.append((time.perf_counter() - started) * 1000)
+        phase.updates += 1
+
+    async def _run_script(self, phase: PhaseResult, script: List[Dict[str, Any]]):
+        # Шаги одного пользователя идут по порядку, пользователи - параллельно
+        async with self.semaphore:
+            for update in script:
+                await self._feed(phase, update)
+
+    async def phase(self, name: str, scripts: List[List[Dict[str, Any]]], flush):
+        phase = PhaseResult(name)
+        queries_before, calls_before = self.db_queries, self.session.calls.copy()
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_script(phase, script) for script in scripts))
+        phase.seconds = time.perf_counter() - started
+        # Фоновые записи и рассылки этапа тоже относятся к нему
+        await flush()
+        phase.db_queries = self.db_queries - queries_before
+        phase.api_calls = dict(self.session.calls - calls_before)
+        self.results.append(phase)
+        return phase
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    os.chdir(workdir)
+    os.makedirs('data', exist_ok=True)
+
+    import main as bot_main
+    from aiogram_calendar import SimpleCalendarCallback
+    from aiogram_calendar.schemas import SimpleCalAct
+    from app.services.database import init_db, load_blocked_users_cache, DATABASE_PATH
+    from app.services.db_pool import db_pool
+    from app.services.delivery import delivery_queue
+    from app.services.fsm_storage import fsm_storage
+    from app.middlewares import CallbackAnswerRecorder
+    from app.services.metrics import BotRequestMetrics
+    from app.utils.message_cleaner import message_cleaner
+
+    await init_db()
+    await db_pool.start(DATABASE_PATH)
+    await load_blocked_users_cache()
+    await message_cleaner.start()
+
+    session = MockSession(latency=args.api_latency_ms / 1000)
+    bot = Bot(token=os.environ['BOT_TOKEN'], session=session)
+    bot.session.middleware(BotRequestMetrics())
+    bot.session.middleware(CallbackAnswerRecorder())
+    fsm_storage.start()
+    dp = Dispatcher(storage=fsm_storage)
+    bot_main.register_middlewares(dp)
+    bot_main.register_handlers(dp)
+    bot_main.register_callback(dp)
+    delivery_queue.start(bot)
+
+    replay = Replay(bot, dp, session, args.concurrency)
+    await db_pool.set_trace_callback(replay.trace)
+
+    async def flush():
+        await fsm_storage.flush()
+        await message_cleaner.flush()
+        await delivery_queue.flush()
+
+    async def session_ids() -> List[int]:
+        async with db_pool.reader() as db:
+            async with db.execute("SELECT id FROM sessions ORDER BY id") as cursor:
+                return [row['id'] for row in await cursor.fetchall()]
+
+    users = [FIRST_USER_ID + i for i in range(args.users)]
+    creators = users[:max(1, args.users // args.users_per_session)]
+    game_date = datetime(datetime.now().year + 1, 6, 15)
+    day = SimpleCalendarCallback(act=SimpleCalAct.day, year=game_date.year, month=game_date.month,
+                                 day=game_date.day).pack()
+    updates = replay.updates
+
+    try:
+        await replay.phase("registration", [
+            [updates.message(user, "/start"), updates.message(user, "Иван"), updates.message(user, "25")]
+            for user in users
+        ], flush)
+        await replay.phase("create_session", [
+            [updates.callback(user, "choose_game"), updates.callback(user, "game_GouseGouseDuck"),
+             updates.callback(user, day), updates.callback(user, "time_18:00"),
+             updates.message(user, str(args.users_per_session + 1))]
+            for user in creators
+        ], flush)
+        sessions = await session_ids()
+        await replay.phase("list_sessions", [
+            [updates.callback(user, "list_sessions")] for user in users
+        ], flush)
+        # Двойное нажатие одной кнопки: второе отвечается без вызова обработчика
+        await replay.phase("double_tap", [
+            [updates.callback(user, "list_sessions", message_id=user),
+             updates.callback(user, "list_sessions", message_id=user)]
+            for user in users
+        ], flush)
+        await replay.phase("join", [
+            [updates.callback(user, f"join_{sessions[i % len(sessions)]}")] for i, user in enumerate(users)
+        ], flush)
+        await replay.phase("confirm", [
+            [updates.callback(user, f"confirm_{sessions[i % len(sessions)]}")] for i, user in enumerate(users)
+        ], flush)
+    finally:
+        await delivery_queue.close()
+        await fsm_storage.close()
+        await message_cleaner.close()
+        await db_pool.close()
+
+    return [result.summary() for result in replay.results]
+
+
+def print_report(summaries: List[Dict[str, Any]]):
+    header = f"{'phase':<16}{'updates':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'upd/s':>9}{'sql/upd':>9}{'api/upd':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in summaries:
+        print(f"{row['phase']:<16}{row['updates']:>8}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+              f"{row['updates_per_s']:>9}{row['db_queries_per_update']:>9}{row['api_calls_per_update']:>9}")
+    print()
+    for row in summaries:
+        calls = ', '.join(f"{method}={count}" for method, count in row['api_calls'].items())
+        print(f"{row['phase']}: {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic updates through the bot dispatcher")
+    parser.add_argument('--users', type=int, default=100, help="number of simulated users")
+    parser.add_argument('--users-per-session', type=int, default=10, help="users per created session")
+    parser.add_argument('--concurrency', type=int, default=10, help="users replayed at the same time")
+    parser.add_argument('--api-latency-ms', type=float, default=0, help="simulated Bot API latency")
+    parser.add_argument('--json', help="write the summary to this file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    summaries = asyncio.run(run(args))
+    print_report(summaries)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(summaries, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()